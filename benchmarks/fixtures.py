@@ -0,0 +1,208 @@
+"""
+Fixtures of the benchmarks. The bundled files under `fixtures/` are used as they are,
+and larger inputs are generated from a fixed seed, so every run sees the same data.
+"""
+import glob
+import gzip
+import io
+import os
+import random
+import tarfile
+from functools import lru_cache
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+OAI_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<responseDate>2017-06-01T00:00:00Z</responseDate>'
+    '<request verb="ListRecords">http://export.arxiv.org/oai2</request><ListRecords>\n')
+OAI_RECORD = ('<record><header><identifier>oai:arXiv.org:{id}</identifier><datestamp>{date}</datestamp>'
+    '<setSpec>physics:cond-mat</setSpec></header><metadata>'
+    '<arXiv xmlns="http://arxiv.org/OAI/arXiv/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<id>{id}</id><created>{date}</created>{updated}<authors>{authors}</authors><title>{title}</title>'
+    '<categories>{cats}</categories>{doi}<abstract>  {abstract}\n</abstract></arXiv></metadata></record>\n')
+OAI_DELETED = ('<record><header status="deleted"><identifier>oai:arXiv.org:{id}</identifier>'
+    '<datestamp>{date}</datestamp><setSpec>physics:cond-mat</setSpec></header></record>\n')
+OAI_FOOTER = '<resumptionToken cursor="{cursor}" completeListSize="{size}">{token}</resumptionToken></ListRecords></OAI-PMH>\n'
+
+WORDS = ('the of and to in we a is that for with as on by this are be from at an which model results '
+    'spin quantum phase transition field energy state system lattice disorder temperature magnetic '
+    'we show find study propose method data network learning localization entanglement dynamics '
+    'density function order parameter critical scaling numerical analysis experimental observed').split()
+CATEGORIES = ('cond-mat.stat-mech', 'cond-mat.str-el', 'cond-mat.dis-nn', 'cond-mat.mes-hall',
+    'cond-mat.supr-con', 'quant-ph', 'stat.ML', 'cs.LG', 'hep-th', 'physics.comp-ph')
+SURNAMES = ('Smith', 'Wang', 'Zhang', 'Li', 'Chen', 'Liu', 'Kim', 'Garcia', 'Mueller', 'Rossi',
+    'Nguyen', 'Tanaka', 'Ivanov', 'Cohen', 'Silva', 'Sadjadi', 'Liao', 'Huse', 'Pal', 'Basko')
+INSTITUTES = ('Department of Physics, Stanford University, Stanford, CA 94305, USA',
+    'Institute for Advanced Study, Tsinghua University, Beijing 100084, China',
+    'Max-Planck-Institut fur Physik komplexer Systeme, 01187 Dresden, Germany',
+    'Kavli Institute for Theoretical Physics, University of California, Santa Barbara, CA 93106, USA')
+
+
+def read_bytes(path):
+    with open(path, 'rb') as fin:
+        return fin.read()
+
+def words(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+def sentence(rng):
+    s = words(rng, rng.randint(6, 24)).capitalize()
+    r = rng.random()
+    if r < 0.15:
+        s += ' $x_{} = \\alpha^{}$'.format(rng.randint(0, 9), rng.randint(2, 4))
+    elif r < 0.3:
+        s += '~\\cite{{ref{}}}'.format(rng.randint(0, 99))
+    elif r < 0.4:
+        s = '\\textbf{{{}}} {}'.format(rng.choice(WORDS), s)
+    elif r < 0.45:
+        s += ' (see Fig.~\\ref{{fig:{}}})'.format(rng.randint(0, 9))
+    return s + '.'
+
+def paragraph(rng):
+    return '\n'.join(sentence(rng) for _ in range(rng.randint(2, 8)))
+
+
+# OAI-PMH ListRecords pages
+
+@lru_cache()
+def oai_pages(n_pages, per_page=1000, seed=0):
+    """
+    Generate `n_pages` ListRecords pages of `per_page` records in the format of
+    the arXiv OAI-PMH interface, chained by resumption tokens, followed by the
+    recorded pages in `fixtures/oai`, the last of which ends the list.
+    """
+    rng = random.Random(seed)
+    pages = []
+    size = n_pages * per_page
+    for p in range(n_pages):
+        parts = [OAI_HEADER]
+        for k in range(p * per_page, (p + 1) * per_page):
+            id = '17{:02d}.{:05d}'.format(k // 99999 % 12 + 1, k % 99999)
+            date = '2017-05-{:02d}'.format(k % 28 + 1)
+            if rng.random() < 0.01:
+                parts.append(OAI_DELETED.format(id=id, date=date))
+                continue
+            authors = ''.join(
+                '<author><keyname>{}</keyname><forenames>{}</forenames></author>'.format(
+                    rng.choice(SURNAMES), rng.choice(SURNAMES)[:1] + '.')
+                for _ in range(rng.randint(1, 8)))
+            parts.append(OAI_RECORD.format(
+                id=id, date=date,
+                updated='<updated>2017-06-01</updated>' if rng.random() < 0.3 else '',
+                authors=authors,
+                title=words(rng, rng.randint(5, 14)).replace(' in ', ' in\n  ', 1),
+                cats=' '.join(rng.sample(CATEGORIES, rng.randint(1, 3))),
+                doi='<doi>10.1103/PhysRevB.{}.{:06d}</doi>'.format(rng.randint(90, 99), k) if rng.random() < 0.4 else '',
+                abstract=' '.join(sentence(rng) for _ in range(rng.randint(4, 10))).replace('. ', '.\n')))
+        token = '{}|{}'.format(seed, (p + 1) * per_page)
+        parts.append(OAI_FOOTER.format(cursor=p * per_page, size=size, token=token))
+        pages.append(''.join(parts).encode('utf-8'))
+    pages += [read_bytes(path) for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'oai', '*.xml')))]
+    return tuple(pages)
+
+
+# E-prints
+
+def make_eprint(files):
+    """Pack `{name: text}` into the bytes of a gzipped tar, as served by arXiv."""
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode='w') as tar:
+            for name in sorted(files):
+                data = files[name].encode('utf-8')
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+def eprint_from_dir(path):
+    files = {}
+    for dpath, _, fnames in os.walk(path):
+        for fname in fnames:
+            fpath = os.path.join(dpath, fname)
+            with open(fpath) as fin:
+                files[os.path.relpath(fpath, path)] = fin.read()
+    return make_eprint(files)
+
+def synthetic_eprint(rng, n_paragraphs=60):
+    authors = '\n'.join('\\author{{{}}}\n\\affiliation{{{}}}'.format(rng.choice(SURNAMES), rng.choice(INSTITUTES))
+        for _ in range(rng.randint(1, 4)))
+    main = ('\\documentclass[aps,prb]{{revtex4-1}}\n\\usepackage{{amsmath}}\n\\title{{{}}}\n{}\n\n'
+        .format(words(rng, 8), authors))
+    sections = {}
+    for s in range(rng.randint(1, 4)):
+        name = 'sec{}.tex'.format(s)
+        body = '\n\n'.join(paragraph(rng) for _ in range(n_paragraphs // 4))
+        sections[name] = '\\section{{{}}}\n{}\n'.format(words(rng, 3), body)
+        main += '\\input{{{}}}\n\n'.format(name[:-4])
+    main += '\n\n'.join(paragraph(rng) for _ in range(n_paragraphs // 4)) + '\n\n\\end{document}\n'
+    files = dict(sections, **{'main.tex': main, 'refs.bib': '@article{{ref0, title={{{}}}}}\n'.format(words(rng, 6))})
+    if rng.random() < 0.2: # some e-prints are a single gzipped file
+        return gzip.compress(main.encode('utf-8'), mtime=0)
+    return make_eprint(files)
+
+@lru_cache()
+def eprints(n, seed=0):
+    """The bundled real-world e-print followed by `n` synthetic ones."""
+    rng = random.Random(seed)
+    bins = [eprint_from_dir(os.path.join(FIXTURE_DIR, 'eprints', 'realworld'))]
+    bins += [synthetic_eprint(rng) for _ in range(n)]
+    return tuple(bins)
+
+
+# LaTeX paragraphs
+
+def latex_paragraphs(n_synthetic, seed=0):
+    """The bundled pathological and parity paragraphs followed by `n_synthetic` generated ones."""
+    paragraphs = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'latex', '*.tex'))):
+        with open(path) as fin:
+            paragraphs += [p for p in fin.read().split('\n\n') if p.strip()]
+    rng = random.Random(seed)
+    paragraphs += [paragraph(rng) for _ in range(n_synthetic)]
+    return paragraphs
+
+
+# PDFs
+
+def pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def make_pdf(pages):
+    """Build a minimal PDF with one page per list of text lines in `pages`."""
+    n = len(pages)
+    objs = ['<< /Type /Catalog /Pages 2 0 R >>',
+        '<< /Type /Pages /Kids [{}] /Count {} >>'.format(' '.join('{} 0 R'.format(4 + 2 * i) for i in range(n)), n),
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    for i, lines in enumerate(pages):
+        stream = 'BT /F1 10 Tf 12 TL 50 750 Td\n{}\nET'.format(
+            '\n'.join('({}) \''.format(pdf_escape(line)) for line in lines))
+        objs.append('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            '/Resources << /Font << /F1 3 0 R >> >> /Contents {} 0 R >>'.format(5 + 2 * i))
+        objs.append('<< /Length {} >>\nstream\n{}\nendstream'.format(len(stream), stream))
+
+    out = '%PDF-1.4\n'
+    offsets = []
+    for i, obj in enumerate(objs):
+        offsets.append(len(out))
+        out += '{} 0 obj\n{}\nendobj\n'.format(i + 1, obj)
+    xref = len(out)
+    out += 'xref\n0 {}\n0000000000 65535 f \n'.format(len(objs) + 1)
+    out += ''.join('{:010d} 00000 n \n'.format(offset) for offset in offsets)
+    out += 'trailer\n<< /Size {} /Root 1 0 R >>\nstartxref\n{}\n%%EOF\n'.format(len(objs) + 1, xref)
+    return out.encode('latin-1')
+
+def pdfs(n, seed=0):
+    """The bundled sample PDFs followed by `n` synthetic ones of 10 pages."""
+    rng = random.Random(seed)
+    bins = [read_bytes(path) for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'pdf', '*.pdf')))]
+    for _ in range(n):
+        bins.append(make_pdf([[words(rng, 12) + '.' for _ in range(60)] for _ in range(10)]))
+    return bins
+
+def long_pdf(n_pages, seed=0):
+    """A synthetic PDF of `n_pages` pages."""
+    rng = random.Random(seed)
+    return make_pdf([[words(rng, 12) + '.' for _ in range(60)] for _ in range(n_pages)])
@@ -0,0 +1,74 @@
+"""
+Parity check of `latex_utils.clean_text` against the recursive regex cleaner it
+replaced. `fixtures/latex/parity.jsonl` holds the paragraphs of `fixtures/latex/*.tex`,
+generated paragraphs and long ones, each with the output of the old cleaner as
+`expected`. A paragraph may only differ from it for one of the `INTENDED` reasons,
+in which case the output of the new cleaner is recorded as `cleaned`:
+
+    python benchmarks/parity.py
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from paperscraper.utils.latex_utils import clean_text
+
+CORPUS = os.path.join(ROOT, 'benchmarks', 'fixtures', 'latex', 'parity.jsonl')
+
+INTENDED = {
+    'math': 'A command inside math, e.g. $\\alpha$, was removed with the closing $, so the old cleaner '
+        'paired the opening $ with a later one, leaving parts of formulas and dropping the text between them.',
+    'argument_before_punctuation': 'A command argument followed by punctuation, e.g. ~\\cite{a}., made the lazy '
+        'command pattern of the old cleaner run on to a later argument, dropping the sentences between them.',
+    'group_command': 'A group starting with a command, e.g. {\\bf bold}, made the old cleaner drop the text '
+        'up to a later closing brace.',
+    'command_before_group': 'A command without argument, e.g. \\item, was removed by the old cleaner up to '
+        'the next braced argument, with the text between them.',
+    'long': 'The old cleaner dropped paragraphs over 2000 characters.',
+}
+
+
+def load(path=CORPUS):
+    with open(path, encoding='utf-8') as fin:
+        return [json.loads(line) for line in fin if line.strip()]
+
+def check(entries):
+    """Return the counts of the intended differences and the entries that do not match."""
+    differences = Counter()
+    failures = []
+    for entry in entries:
+        cleaned = clean_text(entry['text'])
+        reason = entry.get('reason')
+        if reason is None:
+            ok = cleaned == entry['expected']
+        else:
+            ok = reason in INTENDED and cleaned == entry['cleaned']
+            differences[reason] += 1
+        if not ok:
+            failures.append((entry, cleaned))
+    return differences, failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check clean_text against the outputs of the old cleaner.')
+    parser.add_argument('--corpus', default=CORPUS, help='JSON-lines parity corpus')
+    args = parser.parse_args(argv)
+
+    entries = load(args.corpus)
+    differences, failures = check(entries)
+    n_same = len(entries) - sum(differences.values())
+    print('{} of {} paragraphs cleaned as by the old cleaner.'.format(n_same, len(entries)))
+    for reason, n in differences.most_common():
+        print('{} differ on purpose, {}: {}'.format(n, reason, INTENDED.get(reason, 'unknown reason')))
+    for entry, cleaned in failures:
+        print('\nUnexpected output for: {!r}\n  expected: {!r}\n  cleaned:  {!r}'.format(
+            entry['text'], entry.get('cleaned', entry['expected']), cleaned))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
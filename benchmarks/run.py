@@ -0,0 +1,270 @@
+"""
+Offline benchmarks of the hot paths of the scraper, run against the fixtures
+in `benchmarks/fixtures.py`. Each stage reports its throughput and its peak
+memory, and the results are written as JSON to compare them across commits:
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fixtures
+from paperscraper import scraper as scraper_module
+from paperscraper.record import Record
+from paperscraper.utils.const import OAI, ARXIV
+from paperscraper.utils.file_utils import iter_eprint_files, extract_text_from_eprint
+from paperscraper.utils.governor import RateGovernor
+from paperscraper.utils.latex_utils import clean_text
+from paperscraper.utils.matcher import FilterMatcher
+from paperscraper.utils.utils import split_sent
+
+
+class SkipStage(Exception):
+    pass
+
+
+class RecordedPages(object):
+    """Serves `pages` in order in place of the `HttpClient` of a scraper."""
+
+    def __init__(self, pages):
+        self.pages = iter(pages)
+
+    def urlopen(self, req, **kwargs):
+        return io.BytesIO(next(self.pages))
+
+
+# Stages. Each takes the scale of the fixtures and returns a function that runs
+# the stage once and returns the counts of what it processed.
+
+def oai_parse(scale):
+    """Parse ListRecords pages into records with `Scraper.iter_arxiv_records`."""
+    pages = fixtures.oai_pages(5 * scale)
+
+    def run():
+        scraper = scraper_module.Scraper(category='physics:cond-mat', http=RecordedPages(pages),
+            governor=RateGovernor(rate=None))
+        n = sum(1 for _ in scraper.iter_arxiv_records('physics:cond-mat', '2017-05-01', '2017-05-31'))
+        return {'records': n, 'bytes': sum(len(page) for page in pages)}
+    return run
+
+def record_output(scale):
+    """Build `Record`s from parsed elements and decode all their fields."""
+    elems = []
+    for page in fixtures.oai_pages(5 * scale):
+        for metadata in ET.fromstring(page).iter(OAI + 'metadata'):
+            elems.append(metadata.find(ARXIV + 'arXiv'))
+
+    def run():
+        for elem in elems:
+            Record(elem).output()
+        return {'records': len(elems)}
+    return run
+
+def filter_records(scale):
+    """Match records against author, category and keyword filters."""
+    records = [Record(metadata.find(ARXIV + 'arXiv')).output()
+        for page in fixtures.oai_pages(5 * scale)
+        for metadata in ET.fromstring(page).iter(OAI + 'metadata')]
+    matcher = FilterMatcher({
+        'authors': [s.lower() for s in fixtures.SURNAMES[:3]],
+        'categories': ['stat.ML', 'cs.LG'],
+        'abstract': ['neural network', 'machine learning', 'entanglement dynamics'],
+    })
+
+    def run():
+        n = sum(1 for record in records if matcher.is_match(record))
+        return {'records': len(records), 'matched': n}
+    return run
+
+def eprint_untar(scale):
+    """Decompress e-prints in memory and read their LaTeX files."""
+    bins = fixtures.eprints(50 * scale)
+
+    def run():
+        n_files = 0
+        for bin in bins:
+            for _, fin in iter_eprint_files(bin, exts=['tex']):
+                fin.read()
+                n_files += 1
+        return {'eprints': len(bins), 'files': n_files, 'bytes': sum(len(bin) for bin in bins)}
+    return run
+
+def eprint_extract(scale):
+    """Extract the sentences of e-prints with `extract_text_from_eprint`."""
+    bins = fixtures.eprints(50 * scale)
+
+    def run():
+        n_sents = 0
+        for bin in bins:
+            text_lists = extract_text_from_eprint(bin, exts=['tex'])
+            n_sents += sum(len(text_list) for text_list in text_lists or [])
+        return {'eprints': len(bins), 'sentences': n_sents, 'bytes': sum(len(bin) for bin in bins)}
+    return run
+
+def latex_clean(scale):
+    """Clean LaTeX paragraphs, including the pathological ones, with `clean_text`."""
+    paragraphs = fixtures.latex_paragraphs(5000 * scale)
+
+    def run():
+        for p in paragraphs:
+            clean_text(p)
+        return {'paragraphs': len(paragraphs), 'bytes': sum(len(p.encode('utf-8')) for p in paragraphs)}
+    return run
+
+def sentence_split(scale):
+    """Split cleaned paragraphs into sentences with `split_sent`."""
+    texts = [clean_text(p) for p in fixtures.latex_paragraphs(5000 * scale)]
+
+    def run():
+        n_sents = sum(len(split_sent(text)) for text in texts)
+        return {'sentences': n_sents, 'bytes': sum(len(text.encode('utf-8')) for text in texts)}
+    return run
+
+def pdf_extract(scale):
+    """Extract the sentences of PDFs in memory with `text_from_pdf`."""
+    try:
+        import pdftotext
+    except ImportError as e:
+        raise SkipStage(str(e))
+    from paperscraper.utils.pdf_utils import text_from_pdf
+
+    bins = fixtures.pdfs(5 * scale)
+
+    def run():
+        n_sents = sum(len(text_from_pdf(bin)[0]) for bin in bins)
+        return {'pdfs': len(bins), 'sentences': n_sents, 'bytes': sum(len(bin) for bin in bins)}
+    return run
+
+def pdf_extract_parallel(scale):
+    """Extract the sentences of a long PDF with `text_from_pdf`, its pages split between processes."""
+    try:
+        import pdftotext
+    except ImportError as e:
+        raise SkipStage(str(e))
+    from paperscraper.utils.pdf_utils import text_from_pdf
+
+    bin = fixtures.long_pdf(100 * scale)
+    n_procs = min(4, os.cpu_count() or 1)
+
+    def run():
+        n_sents = len(text_from_pdf(bin, n_procs=n_procs)[0])
+        return {'pages': 100 * scale, 'procs': n_procs, 'sentences': n_sents, 'bytes': len(bin)}
+    return run
+
+
+STAGES = OrderedDict([
+    ('oai_parse', oai_parse),
+    ('record_output', record_output),
+    ('filter_records', filter_records),
+    ('eprint_untar', eprint_untar),
+    ('eprint_extract', eprint_extract),
+    ('latex_clean', latex_clean),
+    ('sentence_split', sentence_split),
+    ('pdf_extract', pdf_extract),
+    ('pdf_extract_parallel', pdf_extract_parallel),
+])
+
+
+def measure(run, repeat):
+    """Best wall time over `repeat` runs, then the peak traced memory of one more run."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            counts = run()
+            times.append(time.perf_counter() - t0)
+
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    best = min(times)
+    result = OrderedDict([('seconds', best), ('peak_memory_bytes', peak)])
+    for unit, n in counts.items():
+        result[unit] = n
+        if unit == 'bytes':
+            result['mb_per_s'] = n / best / 1024 ** 2
+        else:
+            result[unit + '_per_s'] = n / best
+    return result
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL)
+        status = subprocess.check_output(['git', 'status', '--porcelain', '--', 'paperscraper'], cwd=ROOT)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit.decode().strip(), bool(status.strip())
+
+def compare(results, baseline):
+    """Print the change of each throughput and peak memory against `baseline`."""
+    print('{:<16} {:<22} {:>14} {:>14} {:>8}'.format('stage', 'metric', 'baseline', 'current', 'ratio'))
+    for name, result in results['stages'].items():
+        base = baseline['stages'].get(name)
+        if not base or 'skipped' in result or 'skipped' in base:
+            continue
+        for metric, value in result.items():
+            if (metric.endswith('_per_s') or metric == 'peak_memory_bytes') and base.get(metric):
+                print('{:<16} {:<22} {:>14.1f} {:>14.1f} {:>7.2f}x'.format(
+                    name, metric, base[metric], value, value / base[metric]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the offline benchmarks.')
+    parser.add_argument('stages', nargs='*', help='stages to run, of {} (default: all)'.format(', '.join(STAGES)))
+    parser.add_argument('--scale', type=int, default=1, help='size multiplier of the generated fixtures')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the best one is reported')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+    for name in args.stages:
+        if name not in STAGES:
+            parser.error('unknown stage \'{}\''.format(name))
+
+    commit, dirty = git_revision()
+    results = OrderedDict([
+        ('commit', commit),
+        ('dirty', dirty),
+        ('date', datetime.datetime.now().isoformat()),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('scale', args.scale),
+        ('repeat', args.repeat),
+        ('stages', OrderedDict()),
+    ])
+    for name in args.stages or STAGES:
+        try:
+            run = STAGES[name](args.scale)
+            result = measure(run, args.repeat)
+        except SkipStage as e:
+            result = {'skipped': str(e)}
+        results['stages'][name] = result
+        print(name, json.dumps(result), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as fout:
+            json.dump(results, fout, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as fin:
+            compare(results, json.load(fin))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Sites that a `Scraper` can scrape, selected by name in `scrape_text` and `scrape_meta`.
+
+A backend module is only imported when its site is selected, so the dependencies
+of other sites (e.g. selenium for MS Academic) are neither needed nor loaded.
+Third party backends are registered under the entry point group
+'paperscraper.backends', e.g. in `setup.py`:
+
+    entry_points={'paperscraper.backends': ['my-site = my_package.backend:MySiteBackend']}
+"""
+import importlib
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = 'paperscraper.backends'
+
+# Built-in backends, also registered as entry points in setup.py, so they are
+# found without scanning the installed packages and when not installed.
+BUILTIN_BACKENDS = {
+    'arxiv': ('paperscraper.backends.arxiv:ArxivBackend', None),
+    'google-scholar': ('paperscraper.backends.google_scholar:GoogleScholarBackend', 'google-scholar'),
+    'ms-academic': ('paperscraper.backends.ms_academic:MsAcademicBackend', 'ms-academic'),
+}
+
+_backends = {}
+
+
+class Backend(object):
+    """
+    A site to scrape. Subclasses implement `scrape_text` and `scrape_meta` for a `Scraper`;
+    those not implemented log that the site is not supported and return None.
+    """
+    name = None
+
+    def scrape_meta(self, scraper, *args, **kwargs):
+        logger.error('site \'{}\' not supported'.format(self.name))
+
+    def scrape_text(self, scraper, *args, **kwargs):
+        logger.error('site \'{}\' not supported'.format(self.name))
+
+
+def register(name, backend):
+    """Register a `Backend` class or instance under the site `name`."""
+    _backends[name] = backend() if isinstance(backend, type) else backend
+
+def load(target):
+    module_name, _, attr = target.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+def iter_entry_points():
+    from importlib.metadata import entry_points
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        return eps.select(group=ENTRY_POINT_GROUP)
+    return eps.get(ENTRY_POINT_GROUP, [])
+
+def available_backends():
+    """Names of the built-in and installed sites."""
+    return sorted(set(BUILTIN_BACKENDS) | set(_backends) | {ep.name for ep in iter_entry_points()})
+
+def get_backend(name):
+    """
+    Return the backend of site `name`, importing it on first use.
+    Raises KeyError if no backend is registered under `name`, and ImportError
+    with the extra to install if the dependencies of the backend are missing.
+    """
+    if name in _backends:
+        return _backends[name]
+
+    if name in BUILTIN_BACKENDS:
+        target, extra = BUILTIN_BACKENDS[name]
+        try:
+            backend = load(target)
+        except ImportError as e:
+            raise ImportError('site \'{}\' requires {} (pip install paperscraper[{}])'.format(name, e.name or e, extra))
+    else:
+        for ep in iter_entry_points():
+            if ep.name == name:
+                backend = ep.load()
+                break
+        else:
+            raise KeyError(name)
+
+    register(name, backend)
+    return _backends[name]
@@ -0,0 +1,12 @@
+from . import Backend
+
+
+class ArxivBackend(Backend):
+    """Metadata from the OAI-PMH interface and text from the e-prints of arXiv."""
+    name = 'arxiv'
+
+    def scrape_meta(self, scraper, *args, **kwargs):
+        return scraper.scrape_arxiv_meta(*args, **kwargs)
+
+    def scrape_text(self, scraper, *args, **kwargs):
+        return scraper.scrape_arxiv_text(*args, **kwargs)
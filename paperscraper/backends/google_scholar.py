@@ -0,0 +1,120 @@
+import logging
+import time
+
+from bs4 import BeautifulSoup
+
+from . import Backend
+from ..utils.fetcher import PdfFetcher
+from ..utils.file_utils import MAX_PDF_BYTES
+from ..utils.sink import TextSink
+from ..utils.utils import try_urlopen
+
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleScholarBackend(Backend):
+    """Text of the PDFs linked from Google Scholar search results. Requires `BeautifulSoup4` and `pdftotext`."""
+    name = 'google-scholar'
+
+    def scrape_text(self, scraper, save_to, log_to, queries, append=False, seen_path=None,
+        max_per_domain=2, max_bytes=MAX_PDF_BYTES, patience=2
+    ):
+        """
+        Scrape the text of the PDFs linked from the result pages of each query.
+        The PDFs are downloaded by `scraper.n_workers` threads, at most `max_per_domain`
+        at a time from a domain, and skipped if larger than `max_bytes`. A PDF linked
+        again, from any query, is not downloaded again; with `seen_path`, the fetched
+        URLs are kept in that file for later scrapes too. A query stops after `patience`
+        consecutive result pages without new PDF links.
+        """
+        fetcher = PdfFetcher(scraper, n_workers=scraper.n_workers, max_per_domain=max_per_domain,
+            max_bytes=max_bytes, seen_path=seen_path)
+
+        # Empty the save files unless appending
+        sink = scraper.open_sink(save_to, append=append)
+        log_sink = TextSink(log_to, append=append)
+
+        # Main
+        t0 = time.time()
+        failed_attempts = 0
+
+        file_cnt = 0
+        sent_cnt = 0
+        extracted_file_ids = []
+        scraped_file_ids = []
+        for query in queries:
+            logger.info('fetching data for query {} ...'.format(query))
+
+            pages_without_new = 0
+            for p in range(100):
+                req = scraper.google_scholar_req(query, p)
+                logger.info(req.get_full_url())
+
+                # Fetch
+                with scraper.metrics.time('request_seconds', kind='search'):
+                    suc, response, failed_attempts = try_urlopen(req, scraper.t, failed_attempts, metrics=scraper.metrics,
+                        client=scraper.http, compressed=True, governor=scraper.governor)
+                if not suc:
+                    continue
+
+                page = BeautifulSoup(response, 'html.parser')
+                scraped_file_ids.append('{}:{}'.format(query, p))
+
+                # Go through each new link
+                download_links = []
+                for pdf_div in page.find_all('div', attrs={'class': 'gs_or_ggsm'}):
+                    pdf_a = pdf_div.findChild('a' , recursive=False) # pdf link should be the first child
+                    if pdf_a is not None and pdf_a.get('href'):
+                        download_links.append(pdf_a.get('href'))
+                download_links = fetcher.new_urls(download_links)
+                if not download_links:
+                    pages_without_new += 1
+                    if pages_without_new >= patience:
+                        logger.info('No new PDF links in {} pages, next query.'.format(pages_without_new))
+                        break
+                    continue
+                pages_without_new = 0
+
+                pdfs = fetcher.iter_fetch(download_links)
+                for download_link, bin in pdfs:
+                    if bin is None:
+                        continue
+                    text_lists = scraper.extract_pdf_text(download_link, bin, max_sent=scraper.max_sent - sent_cnt)
+                    sink.write_lines(text_lists[0])
+
+                    file_cnt += 1
+                    sent_cnt += len(text_lists[0])
+                    extracted_file_ids.append('{}:{}:{}'.format(query, p, download_link))
+                    if sent_cnt >= scraper.max_sent:
+                        break
+                pdfs.close()
+                fetcher.commit()
+                if scraper.dedup is not None:
+                    scraper.dedup.checkpoint()
+
+                if sent_cnt >= scraper.max_sent:
+                    break
+
+            file_ids = ['Scraped'] + scraped_file_ids + ['Extracted'] + extracted_file_ids
+            log_sink.write_lines(file_ids)
+            extracted_file_ids = []
+            scraped_file_ids = []
+
+            if sent_cnt >= scraper.max_sent:
+                break
+
+        fetcher.close()
+        scraper.close_pdf_pool()
+        sink.close()
+        log_sink.close()
+        t1 = time.time()
+        logger.info('Fetching text is completed in {0:.1f} seconds.'.format(t1 - t0))
+        logger.info('File counts: {:d}, sentence counts: {}'.format(file_cnt, sent_cnt))
+        if scraper.dedup is not None:
+            scraper.dedup.close()
+            scraper.dedup.report()
+        scraper.metrics.report()
+        scraper.metrics.event('done', site='google-scholar', seconds=t1 - t0, sent_cnts=[sent_cnt])
+
+        return sent_cnt
@@ -0,0 +1,114 @@
+import logging
+import time
+
+from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
+
+from . import Backend
+from ..utils.sink import TextSink
+
+
+logger = logging.getLogger(__name__)
+
+
+class MsAcademicBackend(Backend):
+    """Text of the PDFs linked from Microsoft Academic search results, browsed with Firefox. Requires `selenium` and `pdftotext`."""
+    name = 'ms-academic'
+
+    def scrape_text(self, scraper, save_to, log_to, queries, append=False):
+        # Empty the save files unless appending
+        sink = scraper.open_sink(save_to, append=append)
+        log_sink = TextSink(log_to, append=append)
+
+        # Main
+        t0 = time.time()
+
+        file_cnt = 0
+        sent_cnt = 0
+        extracted_file_ids = []
+        scraped_file_ids = []
+
+        driver = webdriver.Firefox()
+        is_quit = False
+        for query in queries:
+            logger.info('fetching data for query {} ...'.format(query))
+
+            for p in range(100):
+                url = scraper.ms_academic_url(query, p)
+                logger.info(url)
+
+                # Fetch
+                driver.get(url)
+                try:
+                    main = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, 'paper-title')))
+                except TimeoutException as e:
+                    logger.warning('Driver timeout: {}'.format(e))
+                    break
+                except Exception as e:
+                    logger.warning('Driver exception: {}'.format(e))
+                    driver.quit()
+                    is_quit = True
+                    break
+                scraped_file_ids.append('{}:{}'.format(query, p))
+
+                # Go through each link
+                paper_section_links = driver.find_elements_by_css_selector('section.paper-title > h2 > a')
+                paper_section_urls = [paper_section_link.get_attribute('href') for paper_section_link in paper_section_links]
+                if len(paper_section_urls) == 0:
+                    break
+                for paper_section_url in paper_section_urls:
+                    driver.get(paper_section_url)
+
+                    # Fetch detail page
+                    try:
+                        main = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, 'ulist-fieldOfStudy')))
+                    except TimeoutException as e:
+                        logger.warning('Driver timeout: {}'.format(e))
+                        break
+                    except Exception as e:
+                        logger.warning('Driver exception: {}'.format(e))
+                        is_quit = True
+                        break
+
+                    # Find pdf link
+                    possible_pdfs = driver.find_elements_by_css_selector('ma-paper-detail > div > section:nth-of-type(2) > ma-ulist:nth-of-type(2) > div > div > ul > li > a')
+                    for pdf in possible_pdfs:
+                        download_link = pdf.get_attribute('href')
+                        if download_link.endswith('.pdf'):
+                            text_lists = scraper.extract_pdf(download_link, max_sent=scraper.max_sent - sent_cnt)
+                            if text_lists is not None:
+                                logger.debug(text_lists)
+                                sink.write_lines(text_lists[0])
+
+                                file_cnt += 1
+                                sent_cnt += len(text_lists[0])
+                                extracted_file_ids.append('{}:{}:{}'.format(query, p, download_link))
+
+                if sent_cnt >= scraper.max_sent or is_quit:
+                    break
+
+            file_ids = ['Scraped'] + scraped_file_ids + ['Extracted'] + extracted_file_ids
+            log_sink.write_lines(file_ids)
+            extracted_file_ids = []
+            scraped_file_ids = []
+
+            if sent_cnt >= scraper.max_sent or is_quit:
+                break
+
+        driver.quit()
+        scraper.close_pdf_pool()
+        sink.close()
+        log_sink.close()
+        t1 = time.time()
+        logger.info('Fetching text is completed in {0:.1f} seconds.'.format(t1 - t0))
+        logger.info('File counts: {:d}, sentence counts: {}'.format(file_cnt, sent_cnt))
+        if scraper.dedup is not None:
+            scraper.dedup.close()
+            scraper.dedup.report()
+        scraper.metrics.report()
+        scraper.metrics.event('done', site='ms-academic', seconds=t1 - t0, sent_cnts=[sent_cnt])
+
+        return sent_cnt
@@ -0,0 +1,119 @@
+"""
+Columnar export of arXiv metadata to Parquet, so that large harvests can be
+filtered with pyarrow without loading every record as a Python object.
+Requires `pyarrow` (pip install paperscraper[parquet]).
+"""
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('title', pa.string()),
+    ('abstract', pa.string()),
+    ('categories', pa.dictionary(pa.int32(), pa.string())),
+    ('doi', pa.string()),
+    ('created', pa.string()),
+    ('updated', pa.string()),
+    ('authors', pa.list_(pa.string())),
+    ('url', pa.string()),
+])
+
+
+class MetaParquetWriter(object):
+    """
+    Writes records in the format of `Record.output()` to a Parquet file, in row groups
+    of `row_group_size` records, so that only one row group is held in memory.
+    `authors` is a list column and `categories` is dictionary encoded.
+
+    Paramters
+    ---------
+    path: str
+        Path of the Parquet file.
+    row_group_size: int
+        Records per row group. Default: 100000.
+    compression: str
+        Parquet compression codec. Default: 'zstd'.
+    """
+
+    def __init__(self, path, row_group_size=100000, compression='zstd'):
+        self.path = path
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(path, SCHEMA, compression=compression)
+        self.columns = {name: [] for name in SCHEMA.names}
+        self.n_buffered = 0
+        self.n_records = 0
+
+    def write(self, record):
+        for name, column in self.columns.items():
+            column.append(record[name])
+        self.n_buffered += 1
+        if self.n_buffered >= self.row_group_size:
+            self.flush()
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+        return self.n_records + self.n_buffered
+
+    def flush(self):
+        if not self.n_buffered:
+            return
+        table = pa.Table.from_pydict(self.columns, schema=SCHEMA)
+        self.writer.write_table(table, row_group_size=self.n_buffered)
+        self.n_records += self.n_buffered
+        self.columns = {name: [] for name in SCHEMA.names}
+        self.n_buffered = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        logger.info('Wrote {:d} records to {}.'.format(self.n_records, self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_meta(path, columns=None, filter=None):
+    """
+    Read the records of a Parquet export as a `pyarrow.Table`, with `categories` kept
+    dictionary encoded. `filter` is a `pyarrow.dataset` expression, pushed down to
+    skip the row groups whose statistics cannot match and evaluated on Arrow arrays.
+    """
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format=ds.ParquetFileFormat(read_options={'dictionary_columns': ['categories']}))
+    return dataset.to_table(columns=columns, filter=filter)
+
+def search_meta(path, col, *words, columns=None, filter=None):
+    """
+    `utilities.search_all` over a Parquet export: return a `pyarrow.Table` of the rows
+    whose `col` contains all the (lower-cased) words, e.g. the rows with an author
+    containing each word for `col='authors'`. The words and `filter` are evaluated
+    on Arrow arrays while reading, so the records are not loaded as Python objects.
+    Call `.to_pandas()` on the result for a DataFrame.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    words = [word.lower() for word in words]
+    if pa.types.is_list(SCHEMA.field(col).type):
+        # Substrings of list elements cannot be pushed down, match the flattened lists
+        table = read_meta(path, filter=filter)
+        for word in words:
+            values = table.column(col).combine_chunks()
+            matches = pc.match_substring(pc.list_flatten(values), word)
+            table = table.take(pc.unique(pc.filter(pc.list_parent_indices(values), matches)))
+        return table.select(columns) if columns is not None else table
+
+    field = ds.field(col).cast(pa.string()) # categories are dictionary encoded
+    for word in words:
+        match = pc.match_substring(field, word)
+        filter = match if filter is None else filter & match
+    return read_meta(path, columns=columns, filter=filter)
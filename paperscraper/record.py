@@ -1,39 +1,81 @@
 from .utils.const import ARXIV
 
 
+FIELDS = ('id', 'title', 'abstract', 'categories', 'created', 'updated', 'doi', 'authors')
+FIELD_INDICES = {ARXIV + tag: i for i, tag in enumerate(FIELDS)}
+AUTHORS_INDEX = FIELD_INDICES[ARXIV + 'authors']
+
+
+class _Field(object):
+    """Decodes the raw text of a field on first access and caches the result."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __get__(self, record, owner):
+        if record is None:
+            return self
+        value = record._values[self.index]
+        if not record._decoded & (1 << self.index):
+            if self.index == AUTHORS_INDEX:
+                value = [author.lower() for author in value]
+            else:
+                value = '' if value is None else value.strip().lower().replace('\n', ' ')
+            record._values[self.index] = value
+            record._decoded |= 1 << self.index
+        return value
+
+
 class Record(object):
     """
     A class to hold a single record from ArXiv
     Each records contains the following properties:
 
     object should be of xml.etree.ElementTree.Element.
+
+    The raw text of every field is collected in a single pass over the element,
+    and is only normalized when the field is first accessed. The element itself
+    is not kept, so it can be released by the parser right away.
     """
+    __slots__ = ('_values', '_decoded')
+
+    id = _Field(FIELD_INDICES[ARXIV + 'id'])
+    title = _Field(FIELD_INDICES[ARXIV + 'title'])
+    abstract = _Field(FIELD_INDICES[ARXIV + 'abstract'])
+    cats = _Field(FIELD_INDICES[ARXIV + 'categories'])
+    created = _Field(FIELD_INDICES[ARXIV + 'created'])
+    updated = _Field(FIELD_INDICES[ARXIV + 'updated'])
+    doi = _Field(FIELD_INDICES[ARXIV + 'doi'])
+    authors = _Field(AUTHORS_INDEX)
 
     def __init__(self, xml_record):
-        """if not isinstance(object,ET.Element):
-        raise TypeError("")"""
-        self.xml = xml_record
-        self.id = self._get_text(ARXIV, 'id')
-        self.url = 'https://arxiv.org/abs/' + self.id
-        self.title = self._get_text(ARXIV, 'title')
-        self.abstract = self._get_text(ARXIV, 'abstract')
-        self.cats = self._get_text(ARXIV, 'categories')
-        self.created = self._get_text(ARXIV, 'created')
-        self.updated = self._get_text(ARXIV, 'updated')
-        self.doi = self._get_text(ARXIV, 'doi')
-        self.authors = self._get_authors()
-
-    def _get_text(self, namespace, tag):
-        """Extracts text from an xml field"""
-        try:
-            return self.xml.find(namespace + tag).text.strip().lower().replace('\n', ' ')
-        except:
-            return ''
-
-    def _get_authors(self):
-        authors = self.xml.findall(ARXIV + 'authors/' + ARXIV + 'author')
-        authors = [author.find(ARXIV + 'keyname').text.lower() for author in authors]
-        return authors
+        values = [None] * len(FIELDS)
+        authors = []
+        for child in xml_record:
+            i = FIELD_INDICES.get(child.tag)
+            if i == AUTHORS_INDEX:
+                for author in child:
+                    keyname = author.find(ARXIV + 'keyname')
+                    if keyname is not None and keyname.text:
+                        authors.append(keyname.text)
+            elif i is not None and values[i] is None:
+                values[i] = child.text
+        values[AUTHORS_INDEX] = authors
+
+        self._values = values
+        self._decoded = 0
+
+    @property
+    def url(self):
+        return 'https://arxiv.org/abs/' + self.id
+
+    def __getitem__(self, key):
+        """Access fields by their key in `output()`."""
+        if key == 'categories':
+            return self.cats
+        if key in FIELDS or key == 'url':
+            return getattr(self, key)
+        raise KeyError(key)
 
     def output(self):
         d = {'title': self.title,
@@ -45,4 +87,4 @@ class Record(object):
          'updated': self.updated,
          'authors': self.authors,
          'url': self.url}
-        return d
\ No newline at end of file
+        return d
@@ -7,24 +7,43 @@ Author: Mahdi Sadjadi (sadjadi.seyedmahdi[AT]gmail[DOT]com).
 from __future__ import print_function
 import xml.etree.ElementTree as ET
 import datetime
+import logging
+import os
 import time
 import sys
-from urllib.parse import urlencode
-from urllib.request import urlopen, Request
+from contextlib import closing
+import pickle
+from http.client import HTTPException
+from socket import error as SocketError
+from urllib.parse import urlencode, urlsplit
 from urllib.error import HTTPError
 
-import marisa_trie
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
-
+from .backends import get_backend
 from .record import Record
-from .utils.const import OAI, ARXIV, META_BASE, E_PRINT_BASE, TAR, GOOGLE_SCHOLAR_BASE, MS_ACADEMIC_BASE
-from .utils.utils import get_date_chunks, is_chinese, always_true, always_false, try_urlopen
-from .utils.file_utils import save_tar, untar, save_text, save_classified_text, extract_text, download_pdf
+from .utils.const import OAI, ARXIV, META_BASE, E_PRINT_BASE, TAR, EPRINT, GOOGLE_SCHOLAR_BASE, MS_ACADEMIC_BASE
+from .utils.matcher import FilterMatcher
+from .utils.utils import get_date_chunks, is_chinese, always_true, always_false, try_urlopen, log_to_stdout, iter_ahead
+from .utils.journal import Journal, JournalState
+from .utils.http import default_client
+from .utils.governor import CircuitOpenError, default_governor, parse_retry_after
+from .utils.metrics import Metrics, CountingReader
+from .utils.sink import TextSink
+from .utils.file_utils import extract_text_from_eprint, download_pdf, iter_source_shard, has_ext
+from .utils.pdf_utils import text_from_pdf
+
+
+logger = logging.getLogger(__name__)
+
+
+def eprint_version(meta_record):
+    """The latest version of a paper is identified by its last update date."""
+    return meta_record['updated'] or meta_record['created']
+
+def extract_text_from_eprint_timed(bin, **kwargs):
+    """`extract_text_from_eprint` with its timings, so they can be returned from a worker process."""
+    timings = {}
+    text_lists = extract_text_from_eprint(bin, timings=timings, **kwargs)
+    return text_lists, timings
 
 
 class Scraper(object):
@@ -46,29 +65,92 @@ class Scraper(object):
         final date in format 'YYYY-MM-DD'. Updated eprints are included even if
         they were created outside of the given date range. Default: today.
     t: int
-        Waiting time between subsequent calls to API, triggred by Error 503.
+        Seconds to wait after a failed request, growing exponentially with consecutive
+        failures, and after an Error 503 of the OAI-PMH interface without Retry-After.
+        Default: 30.
     filter: dictionary
         A dictionary where keys are used to limit the saved results. Possible keys:
-        subcats, author, title, abstract. See the example, below.
-    content_type: str
-        The content type of the data to scrape, as specified in response header 'Content-Type'.
+        categories, authors, title, abstract. See the example, below.
+    filter_mode: str
+        'or' keeps records matching any of the filter keys, 'and' keeps records
+        matching all of them. Default: 'or'.
+    content_type: str or list
+        The content type(s) of the data to scrape, as specified in response header 'Content-Type'.
+        Default: gzipped tar and single gzipped file e-prints.
     text_file_exts: list
         A list of file extensions to consider as text file for text extraction.
     max_sent: int
         Maximum number of sentences to scrape
+    n_workers: int
+        Number of e-prints downloaded concurrently while earlier ones are extracted.
+        Default: 1 (serial).
+    n_procs: int
+        Number of processes extracting the text of e-prints. The classifications and
+        filter_text must be picklable (e.g. module level functions rather than lambdas),
+        otherwise the text is extracted in the main process. Default: 1.
+    gazetteer: InstituteGazetteer
+        Known institution names matched in the main LaTeX file, in addition to
+        the University/Institute/College patterns. Default: none.
+    compression: str
+        Compression of the saved text, None, 'gzip' or 'zstd'. Default: None.
+    shard_size: int
+        Roll the saved text into shards of about this many bytes. Default: None (one file).
+    dedup: SentenceDeduplicator
+        Drops sentences already saved to the same class, and optionally
+        near-duplicate papers, before saving. Default: no deduplication.
+    cache: EprintCache
+        Cache of raw e-prints checked before downloading. Default: no cache.
+    store: MetaStore
+        Local metadata store. Only the dates not harvested yet are fetched from arXiv,
+        and the records are read from the store. Default: no store.
+    snapshot: MetaSnapshot
+        Local arXiv metadata snapshot file the records are read from instead of
+        fetching them from arXiv. Default: none.
+    metrics: Metrics
+        Collects the counters and timings of each stage, and passes progress events
+        to its listeners. Default: a new `Metrics` without listeners, see `self.metrics`.
+    http: HttpClient
+        Client of all requests, with its connection pools and timeouts.
+        Default: the client shared by all scrapers of the process.
+    governor: RateGovernor
+        Paces the requests to each host, slows down when a host throttles, honouring
+        its Retry-After, and stops sending requests to a host that keeps failing.
+        Default: the governor shared by all scrapers of the process.
+    verbose: bool
+        Print the progress messages, logged to the 'paperscraper' logger, to stdout.
+        Set to False to configure logging yourself. Default: True.
     """
 
     def __init__(self,
         category='', date_from=None, date_until=None, t=30,
-        filters={}, content_type=TAR, text_file_exts=['tex'], max_sent=100,
-        classifications=None, filter_text=always_true
+        filters={}, content_type=(TAR, EPRINT), text_file_exts=['tex'], max_sent=100,
+        classifications=None, filter_text=always_true, n_workers=1, filter_mode='or',
+        cache=None, store=None, n_procs=1, gazetteer=None, compression=None, shard_size=None,
+        dedup=None, metrics=None, verbose=True, http=None, governor=None,
+        snapshot=None
     ):
         self.cat = str(category)
         self.t = t
+        self.n_workers = max(1, int(n_workers))
+        self.n_procs = max(1, int(n_procs))
+        self.cache = cache
+        self.gazetteer = gazetteer
+        self.compression = compression
+        self.shard_size = shard_size
+        self.dedup = dedup
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.http = http if http is not None else default_client()
+        self.governor = governor if governor is not None else default_governor()
+        if verbose:
+            log_to_stdout()
+        self.store = store
+        self.snapshot = snapshot
         self.content_type = content_type
+        self.content_types = [content_type] if isinstance(content_type, str) else list(content_type)
         self.text_file_exts = text_file_exts
         self.max_sent = max_sent
         self.filter_text = filter_text
+        self._pdf_pool = None
 
         if classifications is None:
             classifications = [always_true] # All in one class
@@ -89,9 +171,7 @@ class Scraper(object):
             self.append_all = True
         else:
             self.append_all = False
-            self.keys = filters.keys()
-            for k, v in self.filters.items():
-                self.filters[k] = marisa_trie.Trie(v)
+            self.matcher = FilterMatcher(self.filters, mode=filter_mode)
 
     @property
     def n_classes(self):
@@ -106,10 +186,134 @@ class Scraper(object):
     def arxiv_eprint_url(self, id):
         return '{}{}'.format(E_PRINT_BASE, id)
 
+    def fetch_arxiv_eprint(self, id, failed_attempts=0, version=''):
+        """
+        Download the e-print of paper `id`, or read it from the cache if any.
+        Returns the raw response body, or None if the download failed or the
+        content type is not the expected one, and the updated failed attempts.
+        """
+        url = self.arxiv_eprint_url(id)
+        if self.cache is not None:
+            bin = self.cache.get(id, version)
+            if bin is not None:
+                logger.info('{} (cached)'.format(url))
+                self.metrics.inc('cache_hits')
+                self.metrics.event('eprint', id=id, bytes=len(bin), cached=True)
+                return bin, failed_attempts
+            self.metrics.inc('cache_misses')
+        logger.info(url)
+
+        t0 = time.perf_counter()
+        suc, response, failed_attempts = try_urlopen(url, self.t, failed_attempts, metrics=self.metrics,
+            client=self.http, governor=self.governor)
+        if not suc:
+            return None, failed_attempts
+
+        # Check content type
+        if response.getheader('Content-Type') not in self.content_types:
+            response.close()
+            self.metrics.inc('skipped_eprints', reason='content_type')
+            return None, failed_attempts
+
+        try:
+            bin = response.read()
+        except Exception as e:
+            logger.warning('Response read error: {}'.format(e))
+            self.metrics.inc('retries', error='read')
+            self.metrics.inc('sleep_seconds', self.t)
+            self.governor.failure(urlsplit(url).hostname)
+            time.sleep(self.t)
+            return None, failed_attempts
+        seconds = time.perf_counter() - t0
+        self.metrics.observe('request_seconds', seconds, kind='eprint')
+        self.metrics.inc('fetched_bytes', len(bin), kind='eprint')
+        self.metrics.event('eprint', id=id, bytes=len(bin), cached=False, seconds=seconds)
+
+        if self.cache is not None:
+            self.cache.put(id, version, bin)
+        return bin, failed_attempts
+
+    def iter_arxiv_eprints(self, meta_records):
+        """
+        Yield `(meta_record, bin)` for each meta record in order, where `bin` is
+        the downloaded e-print or None. With `n_workers` > 1, up to `2 * n_workers`
+        e-prints are downloaded ahead by a thread pool while the caller processes
+        earlier ones.
+        """
+        failed_attempts = 0
+        if self.n_workers == 1:
+            for meta_record in meta_records:
+                bin, failed_attempts = self.fetch_arxiv_eprint(meta_record['id'], failed_attempts, eprint_version(meta_record))
+                yield meta_record, bin
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=self.n_workers)
+        submit = lambda meta_record: pool.submit(
+            self.fetch_arxiv_eprint, meta_record['id'], failed_attempts, eprint_version(meta_record))
+        with closing(iter_ahead(pool, meta_records, submit, 2 * self.n_workers)) as downloads:
+            for meta_record, future in downloads:
+                bin, failed_attempts = future.result()
+                yield meta_record, bin
+
+    def iter_arxiv_texts(self, eprints, classifications):
+        """
+        Yield `(meta_record, text_lists)` for each `(meta_record, bin)` of `eprints` in order,
+        where `text_lists` is the result of `extract_text_from_eprint`, or None if the
+        download failed. With `n_procs` > 1, the e-prints are extracted in a process pool.
+        `classifications` may be changed by the caller in between; the text of classes
+        that became `always_false` after an e-print was submitted is dropped.
+        """
+        kwargs = dict(exts=self.text_file_exts, gazetteer=self.gazetteer)
+        parallel = self.n_procs > 1
+        if parallel:
+            try:
+                pickle.dumps((classifications, kwargs))
+            except Exception as e:
+                logger.warning('Classifications cannot be pickled ({}), extracting in the main process.'.format(e))
+                parallel = False
+        if not parallel:
+            for meta_record, bin in eprints:
+                if bin is None:
+                    yield meta_record, None
+                else:
+                    text_lists, timings = extract_text_from_eprint_timed(
+                        bin, classifications=classifications, meta=meta_record, **kwargs)
+                    self.observe_timings(timings)
+                    yield meta_record, text_lists
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        def submit(eprint):
+            meta_record, bin = eprint
+            if bin is not None:
+                return pool.submit(extract_text_from_eprint_timed, bin,
+                    classifications=classifications[:], meta=meta_record, **kwargs)
+
+        pool = ProcessPoolExecutor(max_workers=self.n_procs)
+        with closing(iter_ahead(pool, eprints, submit, 2 * self.n_procs)) as extractions:
+            for (meta_record, _), future in extractions:
+                text_lists = None
+                if future is not None:
+                    text_lists, timings = future.result()
+                    self.observe_timings(timings)
+                if text_lists:
+                    for i, classification in enumerate(classifications):
+                        if classification is always_false:
+                            text_lists[i] = []
+                yield meta_record, text_lists
+
+    def observe_timings(self, timings):
+        self.metrics.observe('decompress_seconds', timings['decompress'])
+        self.metrics.observe('extract_seconds', timings['extract'])
+
     def google_scholar_req(self, query, page):
         params = dict(q=str(query), start=str(page*10))
         query = urlencode([(k, v.encode('utf-8')) for k, v in params.items()])
         headers = {'User-Agent':'Mozilla/5.0 (Windows NT 6.1; WOW64; rv:23.0) Gecko/20100101 Firefox/23.0'}
+        from urllib.request import Request
         return Request(GOOGLE_SCHOLAR_BASE + '?' + query, headers=headers)
 
     def ms_academic_url(self, query, page):
@@ -118,315 +322,393 @@ class Scraper(object):
         query = urlencode([(k, v.encode('utf-8')) for k, v in params.items()])
         return MS_ACADEMIC_BASE + '?' + query
 
-    def scrape_arxiv_meta(self, category=None, date_from=None, date_until=None):
+    def iter_arxiv_meta(self, category=None, date_from=None, date_until=None):
+        """
+        Yield the records of `category` within the date range that pass the filters,
+        one at a time. With a `snapshot`, the records are read from the snapshot file.
+        With a `store`, only the dates not harvested yet are fetched and the records
+        are read from the store.
+        """
         category = self.cat if category is None else category
         date_from = self.f if date_from is None else date_from
         date_until = self.u if date_until is None else date_until
 
-        t0 = time.time()
+        if self.snapshot is not None:
+            matcher = None if self.append_all else self.matcher
+            for record in self.snapshot.query(category, date_from, date_until, matcher=matcher):
+                yield record
+            return
+
+        if self.store is not None:
+            self.store.harvest(self, category, date_from, date_until)
+            matcher = None if self.append_all else self.matcher
+            for record in self.store.query(category, date_from, date_until, matcher=matcher):
+                yield record
+            return
+
+        for datestamp, record in self.iter_arxiv_records(category, date_from, date_until):
+            if self.append_all or self.is_wanted(record): # only decodes the filtered fields
+                yield record.output()
+
+    def iter_arxiv_records(self, category, date_from, date_until):
+        """
+        Yield `(datestamp, record)` for all records of `category` within the date range.
+        Each ListRecords page is parsed incrementally and the parsed elements are
+        released once their record is yielded, so memory stays bounded by a page
+        rather than by the whole date range.
+        """
         url = self.arxiv_meta_url(date_from, date_until, category)
-        print(url)
-        ds = []
+        logger.info(url)
         k = 1
-        while True:
-            print('fetching up to ', 1000 * k, 'records...')
+        while url is not None:
+            logger.info('fetching up to {} records...'.format(1000 * k))
+            host = urlsplit(url).hostname
+            try:
+                waited = self.governor.acquire(host)
+            except CircuitOpenError as e:
+                # The page cannot be skipped, wait for the circuit to close
+                wait_t = max(0, e.until - time.time())
+                logger.warning('{} Waiting {:.0f} seconds.'.format(e, wait_t))
+                self.metrics.inc('sleep_seconds', wait_t)
+                time.sleep(wait_t)
+                continue
+            if waited:
+                self.metrics.inc('throttle_seconds', waited)
+            t0 = time.perf_counter()
             try:
-                response = urlopen(url)
+                response = CountingReader(self.http.urlopen(url, compressed=True))
             except HTTPError as e:
                 if e.code == 503:
-                    to = int(e.hdrs.get('retry-after', 30))
-                    print('Got 503. Retrying after {} seconds.'.format(self.t))
-                    time.sleep(self.t)
+                    # arXiv asks to retry the same page after Retry-After seconds
+                    to = parse_retry_after(e.headers.get('Retry-After') if e.headers else None)
+                    if to is None:
+                        to = self.t
+                    logger.warning('Got 503. Retrying after {:.0f} seconds.'.format(to))
+                    self.metrics.inc('retries', error=503)
+                    self.metrics.event('retry', url=url, error=503, retry_after=to)
+                    self.governor.throttle(host, to)
                     continue
                 else:
+                    if e.code >= 500:
+                        self.governor.failure(host)
                     raise
+            except (SocketError, HTTPException):
+                self.governor.failure(host)
+                raise
+            self.governor.success(host)
             k += 1
-            xml = response.read()
-            root = ET.fromstring(xml)
-            records = root.findall(OAI + 'ListRecords/' + OAI + 'record')
-            for record in records:
-                meta = record.find(OAI + 'metadata').find(ARXIV + 'arXiv')
-                record = Record(meta).output()
-                if self.append_all:
-                    ds.append(record)
-                else:
-                    save_record = False
-                    for key in self.keys:
-                        for word in self.filters[key]:
-                            if word.lower() in record[key]:
-                                save_record = True
 
-                    if save_record:
-                        ds.append(record)
+            page_url = url
+            url = None
+            list_records = None
+            n_records = 0
+            for event, elem in ET.iterparse(response, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == OAI + 'ListRecords':
+                        list_records = elem
+                    continue
+
+                if elem.tag == OAI + 'record':
+                    metadata = elem.find(OAI + 'metadata')
+                    if metadata is not None: # deleted records have no metadata
+                        datestamp = elem.findtext(OAI + 'header/' + OAI + 'datestamp', '').strip()
+                        n_records += 1
+                        yield datestamp, Record(metadata.find(ARXIV + 'arXiv'))
+                    list_records.remove(elem)
+                elif elem.tag == OAI + 'resumptionToken' and elem.text:
+                    url = META_BASE + 'resumptionToken=%s' % elem.text
+            response.close()
+
+            # The page is parsed while it is read, so this includes the time of the caller
+            seconds = time.perf_counter() - t0
+            self.metrics.observe('request_seconds', seconds, kind='meta')
+            self.metrics.inc('fetched_bytes', response.n_bytes, kind='meta')
+            self.metrics.inc('records', n_records)
+            self.metrics.event('meta_page', url=page_url, records=n_records, bytes=response.n_bytes, seconds=seconds)
+
+    def is_wanted(self, record):
+        return self.matcher.is_match(record)
 
-            try:
-                token = root.find(OAI + 'ListRecords').find(OAI + 'resumptionToken')
-            except:
-                return []
-            if token is None or token.text is None:
-                break
-            else:
-                url = META_BASE + 'resumptionToken=%s' % token.text
+    def scrape_arxiv_meta(self, category=None, date_from=None, date_until=None):
+        t0 = time.time()
+        ds = list(self.iter_arxiv_meta(category=category, date_from=date_from, date_until=date_until))
 
         t1 = time.time()
-        print('Fetching meta is completed in {0:.1f} seconds.'.format(t1 - t0))
-        print('Total number of records {:d}'.format(len(ds)))
+        logger.info('Fetching meta is completed in {0:.1f} seconds.'.format(t1 - t0))
+        logger.info('Total number of records {:d}'.format(len(ds)))
         return ds
-    
-    def scrape_meta(self, site, *args, **kwargs):
-        if site == 'arxiv':
-            self.scrape_arxiv_meta(*args, **kwargs)
-        else:
-            print('site \'{}\' not supported'.format(site))
 
-    def scrape_arxiv_text(self, save_to, log_to, append=False, day_intv=10):
+    def export_arxiv_meta(self, path, category=None, date_from=None, date_until=None, row_group_size=100000):
+        """
+        Write the records of `iter_arxiv_meta` to the Parquet file `path` as they arrive,
+        in row groups of `row_group_size` records, see `MetaParquetWriter`.
+        Returns the number of records written.
+        """
+        from .parquet import MetaParquetWriter
+        t0 = time.time()
+        with MetaParquetWriter(path, row_group_size=row_group_size) as writer:
+            n = writer.write_all(self.iter_arxiv_meta(category=category, date_from=date_from, date_until=date_until))
+        logger.info('Exporting meta is completed in {0:.1f} seconds.'.format(time.time() - t0))
+        return n
+
+    def scrape_meta(self, site, *args, **kwargs):
+        try:
+            backend = get_backend(site)
+        except KeyError:
+            logger.error('site \'{}\' not supported'.format(site))
+            return
+        return backend.scrape_meta(self, *args, **kwargs)
+
+    def open_sink(self, path, **kwargs):
+        return TextSink(path, compression=self.compression, shard_size=self.shard_size, **kwargs)
+
+    def iter_date_chunk_eprints(self, chunk, done_ids):
+        """`(meta_record, bin)` of the papers within date `chunk` not in `done_ids`, downloaded."""
+        start, end = chunk
+        logger.info('fetching data from {} to {} ...'.format(start, end))
+        meta_records = self.scrape_arxiv_meta(date_from=start, date_until=end)
+        meta_records = [meta_record for meta_record in meta_records if meta_record['id'] not in done_ids]
+        return self.iter_arxiv_eprints(meta_records)
+
+    def iter_shard_eprints(self, path, meta_records, done_ids=()):
+        """
+        Yield `(meta_record, bin)` for each e-print in the arXiv source shard at `path`
+        (a tar of gzipped e-prints, as in arXiv's bulk source access) whose id is
+        in `meta_records`, a dict of meta records by id, and not in `done_ids`.
+        The shard is streamed, nothing is unpacked to disk.
+        """
+        shard = os.path.basename(path)
+        logger.info('reading shard {} ...'.format(shard))
+        for id, bin in iter_source_shard(path):
+            meta_record = meta_records.get(id)
+            if meta_record is None or id in done_ids:
+                continue
+            if bin is None: # not a gzipped e-print, e.g. a PDF-only submission
+                self.metrics.inc('skipped_eprints', reason='content_type')
+                yield meta_record, None
+                continue
+            self.metrics.inc('fetched_bytes', len(bin), kind='shard')
+            self.metrics.event('eprint', id=id, bytes=len(bin), shard=shard)
+            yield meta_record, bin
+
+    def scrape_arxiv_text(self, save_to, log_to, append=False, day_intv=10, resume=False, shard_dir=None,
+        checkpoint_interval=100
+    ):
+        """
+        Scrape the text of the papers within the date range, in chunks of `day_intv` days.
+        Progress is recorded in a journal at `log_to` + '.journal' every `checkpoint_interval`
+        e-prints and at the end of each chunk, when the save and log files are checkpointed
+        (which ends their compressed frames, so checkpoints are not made after every e-print).
+        With `resume`, a previous scrape that was interrupted continues where the
+        journal ends: completed e-prints are skipped and the save and log files are
+        truncated to their recorded positions, so that no text is written twice.
+        The hashes of a `SentenceDeduplicator` are committed with each journal entry
+        and rolled back with the journal, so resuming needs a deduplicator kept on
+        disk, i.e. with a `path` and without `near_dup_threshold`.
+
+        With `shard_dir`, a directory of arXiv source tar shards, the e-prints are read
+        from the shards instead of downloaded, one shard per chunk, and joined by id
+        to the metadata of the category, date range and filters. Only the metadata
+        is fetched from arXiv, and the e-prints are extracted by `n_procs` processes.
+        """
         # Handle the save filepaths
         if self.n_classes > 1 and len(save_to) != self.n_classes:
-            print('save_to should be a list of {}(number of classes) filepaths'.format(self.n_classes))
+            logger.error('save_to should be a list of {}(number of classes) filepaths'.format(self.n_classes))
             return
         elif self.n_classes == 1: # ensures we have a list of paths
             if type(save_to) != list:
                 save_to = [save_to]
 
-        # Empty the save files
-        if not append:
-            for path in save_to:
-                with open(path, 'w'): pass
-            with open(log_to, 'w'): pass
+        journal = Journal(log_to + '.journal')
+        state = journal.load(self.n_classes) if resume else None
+        resumed = state is not None
+        if resumed and self.dedup is not None and not self.dedup.persistent:
+            raise ValueError('resuming needs a deduplicator kept on disk, with a path and without near_dup_threshold')
+        if resumed:
+            logger.info('Resuming from journal with sentence counts {}.'.format(state.sent_cnts))
+            sinks = [self.open_sink(path, resume_from=offset) for path, offset in zip(save_to, state.offsets)]
+            log_sink = TextSink(log_to, resume_from=state.log_offset)
+        else:
+            state = JournalState(self.n_classes)
+            # Empty the save files unless appending
+            sinks = [self.open_sink(path, append=append) for path in save_to]
+            log_sink = TextSink(log_to, append=append)
+
+        def positions():
+            return dict(offsets=[sink.checkpoint() for sink in sinks], log_offset=log_sink.checkpoint())
+
+        def checkpoint(type, **entry):
+            # The hashes are tagged with the position of the entry, and rolled back if it is torn
+            if self.dedup is not None:
+                self.dedup.checkpoint(journal.tell())
+            entry.update(positions())
+            journal.write(type, sent_cnts=sent_cnts, **entry)
+
+        journal.open(resume=resumed)
+        if self.dedup is not None:
+            if resumed:
+                self.dedup.rollback(journal.tell())
+            else:
+                self.dedup.settle()
+        if not resumed:
+            journal.write('start', sent_cnts=state.sent_cnts, **positions())
 
         # Main
         t0 = time.time()
-        failed_attempts = 0
 
         file_cnt = 0
-        sent_cnts = [0] * self.n_classes
-        extracted_file_id_list = [[] for _ in range(self.n_classes)]
-        scraped_file_ids = []
-        date_chunks = get_date_chunks(self.f, self.u, intv=day_intv)
+        sent_cnts = state.sent_cnts
+        if shard_dir is None:
+            chunks = get_date_chunks(self.f, self.u, intv=day_intv)
+            iter_chunk_eprints = self.iter_date_chunk_eprints
+        else:
+            chunks = [(name,) for name in sorted(os.listdir(shard_dir)) if has_ext(name, ['tar', 'tar.gz'])]
+            meta_records = {meta_record['id']: meta_record for meta_record in self.scrape_arxiv_meta()}
+            iter_chunk_eprints = lambda chunk, done_ids: self.iter_shard_eprints(
+                os.path.join(shard_dir, chunk[0]), meta_records, done_ids)
         classifications = self.classifications[:] # make a copy so we can modify later
         termination_reached = [False] * self.n_classes
-        for start, end in date_chunks:
-            print('fetching data from ', start, ' to ', end, '...')
-
-            meta_records = self.scrape_arxiv_meta(date_from=start, date_until=end)
-            r = 0
-            while r < len(meta_records):
-                meta_record = meta_records[r]
-                url = self.arxiv_eprint_url(meta_record['id'])
-                scraped_file_ids.append(meta_record['id'])
-                print(url)
-
-                # Fetch
-                suc, response, failed_attempts = try_urlopen(url, self.t, failed_attempts)
-                if not suc:
-                    r += 1 # avoid redoing, may never succeed
-                    continue
+        for i, sent_cnt in enumerate(sent_cnts):
+            if sent_cnt >= self.max_sent:
+                classifications[i] = always_false
+                termination_reached[i] = True
 
-                # Check content type
-                if response.getheader('Content-Type') == self.content_type:
-                    # Decompress, extract, and save
-                    try:
-                        bin = response.read()
-                    except Exception as e:
-                        print('Response read error:', e)
-                        time.sleep(self.t)
-                        r += 1 # avoid redoing, may never succeed
-                        continue
-
-                    tar_file = save_tar(bin)                                    # save to temp file
-                    output_dir = untar(tar_file, exts=self.text_file_exts)      # decompress temp file
-                    if output_dir:
-                        text_lists = extract_text(output_dir, exts=self.text_file_exts, classifications=classifications, meta=meta_record)
-                        save_classified_text(text_lists, save_to=save_to, append=True)
+        for chunk in chunks:
+            chunk = tuple(chunk)
+            if all(termination_reached):
+                break
+            if chunk in state.done_chunks:
+                continue
+
+            # Restore the progress of an interrupted chunk
+            if state.chunk == chunk:
+                done_ids = set(state.chunk_ids)
+                scraped_file_ids = state.chunk_ids
+                extracted_file_id_list = state.chunk_extracted_ids
+            else:
+                done_ids = set()
+                scraped_file_ids = []
+                extracted_file_id_list = [[] for _ in range(self.n_classes)]
+
+            journal_ids, journal_extracted = [], [] # e-prints since the last checkpoint
+            eprints = iter_chunk_eprints(chunk, done_ids)
+            texts = self.iter_arxiv_texts(eprints, classifications)
+            for meta_record, text_lists in texts:
+                scraped_file_ids.append(meta_record['id'])
+                extracted = []
+                if text_lists is not None: # otherwise avoid redoing, may never succeed
+                    # Save extracted text
+                    if text_lists is not False:
+                        if self.dedup is not None:
+                            text_lists = self.dedup.dedup(meta_record['id'], text_lists)
+                        for sink, text_list in zip(sinks, text_lists):
+                            sink.write_lines(text_list)
 
                         file_cnt += 1
                         for i in range(len(text_lists)):
                             sent_cnts[i] += len(text_lists[i])
+                            self.metrics.inc('sentences', len(text_lists[i]), **{'class': i})
+                        self.metrics.inc('papers')
                         for i, text_list in enumerate(text_lists):
                             if len(text_list) > 0:
                                 extracted_file_id_list[i].append(meta_record['id'])
+                                extracted.append(i)
+
+                    for i, sent_cnt in enumerate(sent_cnts):
+                        if not termination_reached[i] and sent_cnt >= self.max_sent:
+                            logger.info('Max number of sentences reached for class {} with {} sentences.'.format(i, sent_cnt))
+                            classifications[i] = always_false
+                            termination_reached[i] = True
 
-                for i, sent_cnt in enumerate(sent_cnts):
-                    if not termination_reached[i] and sent_cnt >= self.max_sent:
-                        print('Max number of sentences reached for class {} with {} sentences.'.format(i, sent_cnt))
-                        classifications[i] = always_false
-                        termination_reached[i] = True
+                journal_ids.append(meta_record['id'])
+                journal_extracted.append(extracted)
+                if len(journal_ids) >= checkpoint_interval:
+                    checkpoint('papers', chunk=list(chunk), ids=journal_ids, extracted=journal_extracted)
+                    journal_ids, journal_extracted = [], []
+                self.metrics.event('paper', id=meta_record['id'], extracted=extracted, sent_cnts=sent_cnts)
 
                 if all(termination_reached):
                     break
-                r += 1
+            texts.close()
+            eprints.close()
 
             file_ids = ['Scraped'] + scraped_file_ids
             for i, extracted_file_ids in enumerate(extracted_file_id_list):
                 file_ids += ['Extracted - class {}'.format(i)]
                 file_ids += extracted_file_ids
-            save_text(file_ids, save_to=log_to, append=True)
-            extracted_file_id_list = [[] for _ in range(self.n_classes)]
-            scraped_file_ids = []
-
-            if all(termination_reached):
-                break
-
-        return sent_cnts
-
-    def scrape_google_scholar(self, save_to, log_to, queries, append=False):
-        # Empty the save files
-        if not append:
-            with open(save_to, 'w'): pass
-            with open(log_to, 'w'): pass
-
-        # Main
-        t0 = time.time()
-        failed_attempts = 0
-
-        file_cnt = 0
-        sent_cnt = 0
-        extracted_file_ids = []
-        scraped_file_ids = []
-        for query in queries:
-            print('fetching data for query', query, '...')
-
-            for p in range(100):
-                req = self.google_scholar_req(query, p)
-                print(req.get_full_url())
-
-                # Fetch
-                suc, response, failed_attempts = try_urlopen(req, self.t, failed_attempts)
-                if not suc:
-                    continue
-
-                page = BeautifulSoup(response, 'html.parser')
-                scraped_file_ids.append('{}:{}'.format(query, p))
-
-                # Go through each link
-                pdf_divs = page.find_all('div', attrs={'class': 'gs_or_ggsm'})
-                for pdf_div in pdf_divs:
-                    pdf_a = pdf_div.findChild('a' , recursive=False) # pdf link should be the first child
-                    download_link = pdf_a.get('href')
-                    print('download', download_link)
-
-                    pdf_file = download_pdf(download_link) # save to temp file
-                    if pdf_file:
-                        text_lists = extract_text(pdf_file, exts=['pdf'], filter_text=self.filter_text)
-                        save_text(text_lists[0], save_to=save_to, append=True)
-
-                        file_cnt += 1
-                        sent_cnt += len(text_lists[0])
-                        extracted_file_ids.append('{}:{}:{}'.format(query, p, download_link))
-
-                if sent_cnt >= self.max_sent:
-                    break
-
-            file_ids = ['Scraped'] + scraped_file_ids + ['Extracted'] + extracted_file_ids
-            save_text(file_ids, save_to=log_to, append=True)
-            extracted_file_ids = []
-            scraped_file_ids = []
-
-            if sent_cnt >= self.max_sent:
-                break
+            log_sink.write_lines(file_ids)
+            checkpoint('chunk', chunk=list(chunk))
+            self.metrics.event('chunk', chunk=list(chunk), sent_cnts=sent_cnts)
 
+        for sink in sinks + [log_sink]:
+            sink.close()
+        journal.close()
         t1 = time.time()
-        print('Fetching text is completed in {0:.1f} seconds.'.format(t1 - t0))
-        print('File counts: {:d}, sentence counts: {}'.format(file_cnt, sent_cnt))
+        logger.info('Fetching text is completed in {0:.1f} seconds.'.format(t1 - t0))
+        logger.info('File counts: {:d}, sentence counts: {}'.format(file_cnt, sent_cnts))
+        if self.dedup is not None:
+            self.dedup.close()
+            self.dedup.report()
+        self.metrics.report()
+        self.metrics.event('done', site='arxiv', seconds=t1 - t0, sent_cnts=sent_cnts)
+        return sent_cnts
 
-        return sent_cnt
+    def extract_pdf(self, download_link, max_sent=None):
+        """
+        Download the PDF at `download_link` and extract its text, or return None if the download failed.
+        The pages of large PDFs are extracted by `n_procs` processes, until `max_sent` sentences are found.
+        """
+        logger.info('download {}'.format(download_link))
+        t0 = time.perf_counter()
+        bin = download_pdf(download_link, client=self.http, governor=self.governor)
+        if not bin:
+            return None
+        self.metrics.observe('request_seconds', time.perf_counter() - t0, kind='pdf')
+        self.metrics.inc('fetched_bytes', len(bin), kind='pdf')
+        return self.extract_pdf_text(download_link, bin, max_sent=max_sent)
+
+    def extract_pdf_text(self, download_link, bin, max_sent=None):
+        """Extract the text of the downloaded PDF `bin`, see `extract_pdf`."""
+        with self.metrics.time('extract_seconds'):
+            text_lists = text_from_pdf(bin, filter_text=self.filter_text, max_sent=max_sent,
+                n_procs=self.n_procs, pool=self.pdf_pool())
+        if self.dedup is not None:
+            text_lists = self.dedup.dedup(download_link, text_lists)
+        self.metrics.inc('sentences', len(text_lists[0]), **{'class': 0})
+        self.metrics.inc('papers')
+        self.metrics.event('paper', id=download_link, sent_cnts=[len(text_lists[0])])
+        return text_lists
+
+    def pdf_pool(self):
+        """
+        The process pool extracting the pages of long PDFs, kept until `close_pdf_pool`
+        so that its processes are started once per scrape, or None if `n_procs` is 1.
+        """
+        if self.n_procs > 1 and self._pdf_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pdf_pool = ProcessPoolExecutor(max_workers=self.n_procs)
+        return self._pdf_pool
+
+    def close_pdf_pool(self):
+        """Shut down the processes of `pdf_pool`, if started."""
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown()
+            self._pdf_pool = None
+
+    def scrape_google_scholar(self, save_to, log_to, queries, append=False, **kwargs):
+        return get_backend('google-scholar').scrape_text(self, save_to, log_to, queries, append=append, **kwargs)
 
     def scrape_ms_academic(self, save_to, log_to, queries, append=False):
-        # Empty the save files
-        if not append:
-            with open(save_to, 'w'): pass
-            with open(log_to, 'w'): pass
-
-        # Main
-        t0 = time.time()
-
-        file_cnt = 0
-        sent_cnt = 0
-        extracted_file_ids = []
-        scraped_file_ids = []
-
-        driver = webdriver.Firefox()
-        is_quit = False
-        for query in queries:
-            print('fetching data for query', query, '...')
-
-            for p in range(100):
-                url = self.ms_academic_url(query, p)
-                print(url)
-
-                # Fetch
-                driver.get(url)
-                try:
-                    main = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, 'paper-title')))
-                except TimeoutException as e:
-                    print('Driver timeout:', e)
-                    break
-                except Exception as e:
-                    print('Driver exception:', e)
-                    driver.quit()
-                    is_quit = True
-                    break
-                scraped_file_ids.append('{}:{}'.format(query, p))
-
-                # Go through each link
-                paper_section_links = driver.find_elements_by_css_selector('section.paper-title > h2 > a')
-                paper_section_urls = [paper_section_link.get_attribute('href') for paper_section_link in paper_section_links]
-                if len(paper_section_urls) == 0:
-                    break
-                for paper_section_url in paper_section_urls:
-                    driver.get(paper_section_url)
-
-                    # Fetch detail page
-                    try:
-                        main = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, 'ulist-fieldOfStudy')))
-                    except TimeoutException as e:
-                        print('Driver timeout:', e)
-                        break
-                    except Exception as e:
-                        print('Driver exception:', e)
-                        is_quit = True
-                        break
-
-                    # Find pdf link
-                    possible_pdfs = driver.find_elements_by_css_selector('ma-paper-detail > div > section:nth-of-type(2) > ma-ulist:nth-of-type(2) > div > div > ul > li > a')
-                    for pdf in possible_pdfs:
-                        download_link = pdf.get_attribute('href')
-                        if download_link.endswith('.pdf'):
-                            print('download', download_link)
-                            pdf_file = download_pdf(download_link) # save to temp file
-                            if pdf_file:
-                                text_lists = extract_text(pdf_file, exts=['pdf'], filter_text=self.filter_text)
-                                print(text_lists)
-                                save_text(text_lists[0], save_to=save_to, append=True)
-
-                                file_cnt += 1
-                                sent_cnt += len(text_lists[0])
-                                extracted_file_ids.append('{}:{}:{}'.format(query, p, download_link))
-
-                if sent_cnt >= self.max_sent or is_quit:
-                    break
-
-            file_ids = ['Scraped'] + scraped_file_ids + ['Extracted'] + extracted_file_ids
-            save_text(file_ids, save_to=log_to, append=True)
-            extracted_file_ids = []
-            scraped_file_ids = []
-
-            if sent_cnt >= self.max_sent or is_quit:
-                break
-
-        driver.quit()
-        t1 = time.time()
-        print('Fetching text is completed in {0:.1f} seconds.'.format(t1 - t0))
-        print('File counts: {:d}, sentence counts: {}'.format(file_cnt, sent_cnt))
-
-        return sent_cnt
+        return get_backend('ms-academic').scrape_text(self, save_to, log_to, queries, append=append)
 
     def scrape_text(self, site, *args, **kwargs):
-        if site == 'arxiv':
-            return self.scrape_arxiv_text(*args, **kwargs)
-        elif site == 'google-scholar':
-            return self.scrape_google_scholar(*args, **kwargs)
-        elif site == 'ms-academic':
-            return self.scrape_ms_academic(*args, **kwargs)
-        else:
-            print('site \'{}\' not supported'.format(site))
+        """
+        Scrape text with the backend of `site`, e.g. 'arxiv', 'google-scholar' or 'ms-academic',
+        see `paperscraper.backends`. The backend is imported on first use.
+        """
+        try:
+            backend = get_backend(site)
+        except KeyError:
+            logger.error('site \'{}\' not supported'.format(site))
+            return
+        return backend.scrape_text(self, *args, **kwargs)
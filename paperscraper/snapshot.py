@@ -0,0 +1,176 @@
+"""
+A local copy of the arXiv metadata snapshot, a JSON-lines file with one paper per
+line, read as a metadata source instead of the OAI-PMH interface.
+"""
+import json
+import logging
+import os
+from array import array
+
+try:
+    import orjson # optional, parses the lines several times faster
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+from .utils.const import PHYSICS_ARCHIVES
+
+
+logger = logging.getLogger(__name__)
+
+MONTHS = {month: i + 1 for i, month in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])}
+UPDATE_DATE_KEY = b'"update_date":'
+
+
+def version_date(version):
+    """'YYYY-MM-DD' of a version's creation date, e.g. 'Mon, 2 Apr 2007 19:18:42 GMT'."""
+    _, day, month, year = version['created'].split()[:4]
+    return '{}-{:02d}-{:02d}'.format(year, MONTHS[month], int(day))
+
+def normalize(value):
+    return '' if value is None else value.strip().lower().replace('\n', ' ')
+
+def snapshot_record(paper):
+    """A paper of the snapshot in the format of `Record.output()`."""
+    versions = paper.get('versions') or []
+    id = normalize(paper['id'])
+    return {'title': normalize(paper.get('title')),
+        'id': id,
+        'abstract': normalize(paper.get('abstract')),
+        'categories': normalize(paper.get('categories')),
+        'doi': normalize(paper.get('doi')),
+        'created': version_date(versions[0]) if versions else '',
+        'updated': version_date(versions[-1]) if len(versions) > 1 else '',
+        'authors': [author[0].lower() for author in paper.get('authors_parsed') or [] if author and author[0]],
+        'url': 'https://arxiv.org/abs/' + id}
+
+def set_archives(set_spec):
+    """The archives of an OAI-PMH set, e.g. 'physics:cond-mat' -> ['cond-mat'], or None for all."""
+    if not set_spec:
+        return None
+    if ':' in set_spec:
+        return [set_spec.split(':', 1)[1]]
+    if set_spec == 'physics':
+        return PHYSICS_ARCHIVES
+    return [set_spec]
+
+def in_archives(categories, archives):
+    return any(category == archive or category.startswith(archive + '.')
+        for category in categories.split() for archive in archives)
+
+
+class MetaSnapshot(object):
+    """
+    Streams the papers of an arXiv metadata snapshot file, as in `MetaStore.query`.
+
+    The records are selected by their `update_date`, the date of their last change,
+    like the datestamps of OAI-PMH. On the first query with a date range, a sidecar
+    index of the byte offsets of the lines by update date is built in one pass over
+    the file, so that later queries only read the lines within their date range.
+    The index is rebuilt if the snapshot file changes.
+
+    Paramters
+    ---------
+    path: str
+        Path of the JSON-lines snapshot file.
+    index_path: str
+        Path of the offset index. Default: `path` + '.idx'.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path if index_path is not None else path + '.idx'
+        self.dates = None   # update date -> (start, count) in self.offsets
+        self.offsets = None
+
+    def signature(self):
+        stat = os.stat(self.path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load_index(self):
+        """Load the offset index, building it first if it is missing or stale."""
+        if self.dates is not None:
+            return
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, 'rb') as fin:
+                header = json.loads(fin.readline().decode('utf-8'))
+                if header['snapshot'] == self.signature():
+                    self.offsets = array('Q')
+                    self.offsets.frombytes(fin.read())
+                    self.dates = header['dates']
+                    return
+        self.build_index()
+
+    def build_index(self):
+        logger.info('Indexing {} by update date ...'.format(self.path))
+        by_date = {}
+        offset = 0
+        with open(self.path, 'rb') as fin:
+            for line in fin:
+                date = self.update_date(line)
+                if date is not None:
+                    if date not in by_date:
+                        by_date[date] = array('Q')
+                    by_date[date].append(offset)
+                offset += len(line)
+
+        self.dates = {}
+        self.offsets = array('Q')
+        for date in sorted(by_date):
+            self.dates[date] = (len(self.offsets), len(by_date[date]))
+            self.offsets.extend(by_date[date])
+
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'wb') as fout:
+            header = {'snapshot': self.signature(), 'dates': self.dates}
+            fout.write(json.dumps(header).encode('utf-8') + b'\n')
+            fout.write(self.offsets.tobytes())
+        os.replace(tmp_path, self.index_path)
+        logger.info('Indexed {:d} papers over {:d} dates.'.format(len(self.offsets), len(self.dates)))
+
+    def update_date(self, line):
+        # Find the field without parsing the whole line
+        i = line.find(UPDATE_DATE_KEY)
+        if i >= 0:
+            start = line.find(b'"', i + len(UPDATE_DATE_KEY))
+            end = line.find(b'"', start + 1)
+            if start >= 0 and end >= 0:
+                return line[start + 1:end].decode('ascii', errors='ignore')
+        line = line.strip()
+        if not line:
+            return None
+        return loads(line).get('update_date')
+
+    def iter_lines(self, date_from=None, date_until=None):
+        """The lines of the papers updated within the date range, in the order of the file."""
+        with open(self.path, 'rb') as fin:
+            if date_from is None and date_until is None:
+                for line in fin:
+                    yield line
+                return
+
+            self.load_index()
+            offsets = array('Q')
+            for date, (start, count) in self.dates.items():
+                if (date_from is None or date >= date_from) and (date_until is None or date <= date_until):
+                    offsets.extend(self.offsets[start:start + count])
+            for offset in sorted(offsets): # read forward
+                fin.seek(offset)
+                yield fin.readline()
+
+    def query(self, set_spec=None, date_from=None, date_until=None, matcher=None):
+        """
+        Yield the papers of `set_spec` updated within the date range, in the format of
+        `Record.output()`. If a `FilterMatcher` is given, only the records passing it are yielded.
+        """
+        archives = set_archives(set_spec)
+        for line in self.iter_lines(date_from, date_until):
+            if not line.strip():
+                continue
+            paper = loads(line)
+            if archives is not None and not in_archives(paper.get('categories') or '', archives):
+                continue
+            record = snapshot_record(paper)
+            if matcher is None or matcher.is_match(record):
+                yield record
@@ -0,0 +1,200 @@
+"""
+A persistent local store of arXiv metadata, so that repeated harvests only
+fetch the dates not harvested yet and filter queries do not touch the network.
+"""
+import datetime
+import json
+import logging
+import sqlite3
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('id', 'title', 'abstract', 'categories', 'doi', 'created', 'updated', 'authors', 'url')
+INDEXED_COLUMNS = ('title', 'abstract', 'authors', 'categories')
+
+
+def quote(phrase):
+    return '"{}"'.format(phrase.replace('"', '""'))
+
+def filters_query(filters, mode='or'):
+    """
+    A `MetaStore.search` query close to the `filters` of a `Scraper`: the values of a key
+    are joined with OR, and the keys with `mode` ('or' or 'and'). Authors are matched as
+    whole keynames, like `FilterMatcher`. Titles, abstracts and categories are matched as
+    phrases prefixing their words ('superconduct' matches 'superconductivity', 'cond-mat'
+    matches 'cond-mat.supr-con'), where `FilterMatcher` matches any substring, so a value
+    starting within a word (e.g. 'conduct') matches fewer records here.
+    """
+    clauses = []
+    for key, values in filters.items():
+        if key not in INDEXED_COLUMNS:
+            raise KeyError(key)
+        if values:
+            suffix = '' if key == 'authors' else '*'
+            clauses.append('(' + ' OR '.join('{}: {}{}'.format(key, quote(value), suffix) for value in values) + ')')
+    return ' {} '.format(mode.upper()).join(clauses)
+
+
+class MetaStore(object):
+    """
+    Stores the fields of `Record.output()` in SQLite, together with the OAI-PMH
+    datestamp of each record and the date range harvested for each set.
+
+    The words of the titles and abstracts, the author keynames and the category codes
+    are indexed in an SQLite FTS5 inverted index, updated as records are added, so
+    that `search` and `query(search=...)` do not scan the records.
+
+    Paramters
+    ---------
+    path: str
+        Path of the SQLite database, created if it does not exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS records (
+                id TEXT PRIMARY KEY, title TEXT, abstract TEXT, categories TEXT, doi TEXT,
+                created TEXT, updated TEXT, authors TEXT, url TEXT, datestamp TEXT
+            );
+            CREATE INDEX IF NOT EXISTS records_datestamp ON records (datestamp);
+            CREATE TABLE IF NOT EXISTS record_sets (
+                id TEXT, set_spec TEXT, PRIMARY KEY (set_spec, id)
+            );
+            CREATE TABLE IF NOT EXISTS harvests (
+                set_spec TEXT PRIMARY KEY, date_from TEXT, date_until TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS records_index USING fts5 (
+                title, abstract, authors, categories, content='', tokenize='unicode61 remove_diacritics 2'
+            );
+        ''')
+        self.conn.commit()
+        self.build_index()
+
+    def build_index(self):
+        """Index the records of a store created before the index existed."""
+        if self.conn.execute('SELECT rowid FROM records_index LIMIT 1').fetchone() is not None:
+            return
+        if self.conn.execute('SELECT rowid FROM records LIMIT 1').fetchone() is None:
+            return
+        logger.info('Indexing the stored records ...')
+        self.conn.execute('''
+            INSERT INTO records_index (rowid, title, abstract, authors, categories)
+            SELECT rowid, title, abstract, (SELECT group_concat(value, ' ') FROM json_each(authors)), categories
+            FROM records
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def harvested_range(self, set_spec):
+        """Return `(date_from, date_until)` harvested for `set_spec`, or None."""
+        return self.conn.execute(
+            'SELECT date_from, date_until FROM harvests WHERE set_spec = ?', (set_spec,)).fetchone()
+
+    def add(self, set_spec, records, batch_size=1000):
+        """Insert or update `(datestamp, record)` pairs harvested for `set_spec`."""
+        n = 0
+        for datestamp, record in records:
+            d = record.output() if hasattr(record, 'output') else record
+            row = [d[col] for col in COLUMNS]
+            row[COLUMNS.index('authors')] = json.dumps(d['authors'])
+            self.unindex(d['id'])
+            cursor = self.conn.execute(
+                'INSERT OR REPLACE INTO records VALUES ({})'.format(', '.join(['?'] * (len(COLUMNS) + 1))),
+                row + [datestamp])
+            self.conn.execute(
+                'INSERT INTO records_index (rowid, title, abstract, authors, categories) VALUES (?, ?, ?, ?, ?)',
+                (cursor.lastrowid, d['title'], d['abstract'], ' '.join(d['authors']), d['categories']))
+            self.conn.execute('INSERT OR IGNORE INTO record_sets VALUES (?, ?)', (d['id'], set_spec))
+            n += 1
+            if n % batch_size == 0:
+                self.conn.commit()
+        self.conn.commit()
+        return n
+
+    def unindex(self, id):
+        """Remove the stored record `id`, if any, from the index before it is replaced."""
+        row = self.conn.execute(
+            'SELECT rowid, title, abstract, authors, categories FROM records WHERE id = ?', (id,)).fetchone()
+        if row is not None:
+            rowid, title, abstract, authors, categories = row
+            # A contentless index is updated by deleting the indexed values
+            self.conn.execute(
+                'INSERT INTO records_index (records_index, rowid, title, abstract, authors, categories) '
+                'VALUES (\'delete\', ?, ?, ?, ?, ?)',
+                (rowid, title, abstract, ' '.join(json.loads(authors)), categories))
+
+    def harvest(self, scraper, set_spec, date_from, date_until):
+        """
+        Fetch the records of `set_spec` within the date range that are not in the store yet.
+        The boundary days of the harvested range are fetched again, since more records may
+        have been added on them after the last harvest.
+        """
+        date_until = min(date_until, str(datetime.date.today()))
+        harvested = self.harvested_range(set_spec)
+        if harvested is None:
+            ranges = [(date_from, date_until)]
+        else:
+            ranges = []
+            if date_from < harvested[0]:
+                ranges.append((date_from, harvested[0]))
+            if date_until > harvested[1]:
+                ranges.append((harvested[1], date_until))
+            date_from = min(date_from, harvested[0])
+            date_until = max(date_until, harvested[1])
+
+        for f, u in ranges:
+            n = self.add(set_spec, scraper.iter_arxiv_records(set_spec, f, u))
+            logger.info('Stored {:d} records of {} from {} to {}.'.format(n, set_spec, f, u))
+
+        self.conn.execute('INSERT OR REPLACE INTO harvests VALUES (?, ?, ?)', (set_spec, date_from, date_until))
+        self.conn.commit()
+
+    def select(self, columns, set_spec=None, date_from=None, date_until=None, search=None):
+        sql = 'SELECT {} FROM records'.format(', '.join('records.' + col for col in columns))
+        conditions, params = [], []
+        if search is not None:
+            sql += ' JOIN records_index ON records.rowid = records_index.rowid'
+            conditions.append('records_index MATCH ?')
+            params.append(search)
+        if set_spec is not None:
+            sql += ' JOIN record_sets ON records.id = record_sets.id'
+            conditions.append('record_sets.set_spec = ?')
+            params.append(set_spec)
+        if date_from is not None:
+            conditions.append('records.datestamp >= ?')
+            params.append(date_from)
+        if date_until is not None:
+            conditions.append('records.datestamp <= ?')
+            params.append(date_until)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY records.datestamp, records.id'
+        return self.conn.execute(sql, params)
+
+    def query(self, set_spec=None, date_from=None, date_until=None, matcher=None, search=None):
+        """
+        Yield the stored records of `set_spec` whose datestamp is within the date range,
+        in the format of `Record.output()`. If a `FilterMatcher` is given, only the
+        records passing it are yielded. If a `search` query is given, only the records
+        matching it in the index are read, see `search`.
+        """
+        for row in self.select(COLUMNS, set_spec, date_from, date_until, search):
+            record = dict(zip(COLUMNS, row))
+            record['authors'] = json.loads(record['authors'])
+            if matcher is None or matcher.is_match(record):
+                yield record
+
+    def search(self, query, set_spec=None, date_from=None, date_until=None):
+        """
+        Return the ids of the stored records matching `query` in the index, e.g.
+        'title: graphene AND authors: geim', 'abstract: "quantum hall" OR categories: "cond-mat.mes-hall"',
+        or `filters_query(filters)`. Words are matched case and accent insensitively,
+        'superconduct*' matches the words starting with 'superconduct', and a quoted phrase
+        matches consecutive words. The query syntax is that of SQLite FTS5.
+        """
+        return [id for id, in self.select(('id',), set_spec, date_from, date_until, query)]
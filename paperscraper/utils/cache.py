@@ -0,0 +1,96 @@
+import hashlib
+import logging
+import os
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+
+class EprintCache(object):
+    """
+    A size-bounded on-disk cache of raw e-print bytes, which can be shared by
+    several scrapers on a host.
+
+    Entries are keyed by arXiv id and version and stored under the hash of the key.
+    Writes go to a temporary file which is atomically renamed into place, and the
+    least recently used entries are evicted once the cache exceeds `max_bytes`.
+
+    Paramters
+    ---------
+    cache_dir: str
+        Directory of the cache, created if it does not exist.
+    max_bytes: int
+        Byte budget of the cache. Default: 10 GB.
+    """
+
+    TMP_PREFIX = '.tmp-'
+
+    def __init__(self, cache_dir, max_bytes=10 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(os.path.getsize(path) for path, _ in self._entries())
+
+    def path(self, id, version=''):
+        key = hashlib.sha1('{}@{}'.format(id, version).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, id, version=''):
+        path = self.path(id, version)
+        try:
+            with open(path, 'rb') as fin:
+                bin = fin.read()
+            os.utime(path) # mark as recently used
+        except OSError:
+            return None
+        return bin
+
+    def put(self, id, version, bin):
+        path = self.path(id, version)
+        dir = os.path.dirname(path)
+        os.makedirs(dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=dir, prefix=self.TMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as fout:
+                fout.write(bin)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning('Cache write error: {}'.format(e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self.size += len(bin)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self, ratio=0.9):
+        """Remove least recently used entries until the cache is under `ratio` of its budget."""
+        entries = []
+        for path, stat in self._entries():
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        size = sum(e[1] for e in entries)
+        for _, fsize, path in entries:
+            if size <= self.max_bytes * ratio:
+                break
+            try:
+                os.remove(path)
+            except OSError: # already evicted by another scraper
+                pass
+            size -= fsize
+        self.size = size
+
+    def _entries(self):
+        for dpath, dnames, fnames in os.walk(self.cache_dir):
+            for fname in fnames:
+                if fname.startswith(self.TMP_PREFIX):
+                    continue
+                path = os.path.join(dpath, fname)
+                try:
+                    yield path, os.stat(path)
+                except OSError:
+                    pass
@@ -11,6 +11,10 @@ CATS = [
     'astro-ph', 'cond-mat', 'gr-qc', 'hep-ex', 'hep-lat', 'hep-ph', 'hep-th',
     'math-ph', 'nlin', 'nucl-ex', 'nucl-th', 'physics', 'quant-ph', 'math', 'CoRR', 'q-bio',
     'q-fin', 'stat']
+# Archives of the 'physics' set of OAI-PMH
+PHYSICS_ARCHIVES = [
+    'astro-ph', 'cond-mat', 'gr-qc', 'hep-ex', 'hep-lat', 'hep-ph', 'hep-th',
+    'math-ph', 'nlin', 'nucl-ex', 'nucl-th', 'physics', 'quant-ph']
 SUBCATS = {
     'cond-mat': [
         'cond-mat.dis-nn', 'cond-mat.mtrl-sci', 'cond-mat.mes-hall',
@@ -52,4 +56,5 @@ SUBCATS = {
 
 # Content-Type
 TAR = 'application/x-eprint-tar'
+EPRINT = 'application/x-eprint' # single gzipped file
 PDF = 'application/pdf'
\ No newline at end of file
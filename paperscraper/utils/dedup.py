@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import math
+import sqlite3
+
+
+logger = logging.getLogger(__name__)
+
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class BloomFilter(object):
+    """
+    A memory-bounded set of 64-bit hashes with false positives at about `error_rate`
+    once `capacity` hashes are added, and no false negatives.
+    """
+
+    def __init__(self, capacity, error_rate=1e-4):
+        self.n_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.n_hashes = max(1, int(round(self.n_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+
+    def add(self, h):
+        """Add hash `h`. Returns whether it was (probably) added before."""
+        h1, h2 = h & 0xffffffff, (h >> 32) | 1 # double hashing
+        seen = True
+        for i in range(self.n_hashes):
+            pos = (h1 + i * h2) % self.n_bits
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & bit:
+                seen = False
+                self.bits[byte] |= bit
+        return seen
+
+
+class DiskHashSet(object):
+    """
+    An exact set of 64-bit hashes kept in SQLite, persistent across scrapes.
+    Added hashes are kept once committed. Each commit is tagged with a position,
+    e.g. of a progress journal, so that the set can be rolled back with the journal.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS hashes (h INTEGER PRIMARY KEY, seq INTEGER)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS hashes_seq ON hashes (seq)')
+
+    def add(self, h):
+        """Add hash `h`. Returns whether it was added before."""
+        h -= 1 << 63 # SQLite integers are signed
+        cursor = self.conn.execute('INSERT OR IGNORE INTO hashes VALUES (?, NULL)', (h,))
+        return cursor.rowcount == 0
+
+    def __contains__(self, h):
+        h -= 1 << 63
+        return self.conn.execute('SELECT 1 FROM hashes WHERE h = ?', (h,)).fetchone() is not None
+
+    def commit(self, seq=0):
+        """Commit the hashes added since the last commit, tagged with `seq`."""
+        self.conn.execute('UPDATE hashes SET seq = ? WHERE seq IS NULL', (seq,))
+        self.conn.commit()
+
+    def rollback(self, seq):
+        """Drop the uncommitted hashes and those committed with a tag of at least `seq`."""
+        self.conn.rollback()
+        self.conn.execute('DELETE FROM hashes WHERE seq >= ?', (seq,))
+        self.conn.commit()
+
+    def settle(self):
+        """Tag all committed hashes with 0, so that no later rollback drops them."""
+        self.conn.execute('UPDATE hashes SET seq = 0 WHERE seq > 0')
+        self.conn.commit()
+
+
+class MinHashIndex(object):
+    """
+    Finds near-duplicate documents by the Jaccard similarity of their word shingles,
+    estimated with MinHash signatures and looked up with LSH banding.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, shingle_size=5):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.perms = [(hash64('a{}'.format(i)) % MERSENNE_PRIME | 1, hash64('b{}'.format(i)) % MERSENNE_PRIME)
+                      for i in range(num_perm)]
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = {}
+
+    def signature(self, text):
+        words = text.split()
+        n = max(1, len(words) - self.shingle_size + 1)
+        shingles = {hash64(' '.join(words[i:i + self.shingle_size])) for i in range(n)}
+        return tuple(min((a * s + b) % MERSENNE_PRIME for s in shingles) for a, b in self.perms)
+
+    def add(self, id, text):
+        """Add document `id`. Returns the id of an earlier near duplicate, or None."""
+        sig = self.signature(text)
+        keys = [sig[i * self.rows:(i + 1) * self.rows] for i in range(self.bands)]
+        for bucket, key in zip(self.buckets, keys):
+            other = bucket.get(key)
+            if other is not None:
+                other_sig = self.signatures[other]
+                similarity = sum(x == y for x, y in zip(sig, other_sig)) / float(self.num_perm)
+                if similarity >= self.threshold:
+                    return other
+
+        self.signatures[id] = sig
+        for bucket, key in zip(self.buckets, keys):
+            bucket.setdefault(key, id)
+        return None
+
+
+class SentenceDeduplicator(object):
+    """
+    Drops sentences already written to the same class, by their 64-bit hashes
+    kept in a Bloom filter, or in an exact disk-backed set if `path` is given.
+    Optionally drops whole papers that are near duplicates of earlier ones
+    (e.g. other versions or cross-lists), by MinHash over their text.
+
+    Paramters
+    ---------
+    capacity: int
+        Expected number of distinct sentences, sizing the Bloom filter.
+    error_rate: float
+        False positive rate of the Bloom filter at `capacity`, i.e. the rate of
+        unique sentences wrongly dropped.
+    path: str
+        Path of an SQLite file for an exact set of hashes instead of the Bloom filter.
+        It persists across scrapes, and is rolled back with the journal of a resumed
+        scrape. The Bloom filter and the near-duplicate index are only kept in memory,
+        so a scrape using them cannot be resumed.
+    near_dup_threshold: float
+        Estimated Jaccard similarity above which a paper is a near duplicate. Default: None (off).
+    """
+
+    def __init__(self, capacity=10 ** 7, error_rate=1e-4, path=None, near_dup_threshold=None):
+        self.hashes = DiskHashSet(path) if path is not None else BloomFilter(capacity, error_rate)
+        self.near_dups = MinHashIndex(near_dup_threshold) if near_dup_threshold is not None else None
+        self.seen_cnts = []
+        self.dup_cnts = []
+        self.near_dup_papers = 0
+
+    def dedup(self, id, text_lists):
+        """Return `text_lists` of paper `id` without the sentences seen before in each class."""
+        while len(self.seen_cnts) < len(text_lists):
+            self.seen_cnts.append(0)
+            self.dup_cnts.append(0)
+
+        if self.near_dups is not None and any(text_lists):
+            text = ' '.join(sent for text_list in text_lists for sent in text_list)
+            if self.near_dups.add(id, text) is not None:
+                self.near_dup_papers += 1
+                for i, text_list in enumerate(text_lists):
+                    self.seen_cnts[i] += len(text_list)
+                    self.dup_cnts[i] += len(text_list)
+                return [[] for _ in text_lists]
+
+        deduped = []
+        for i, text_list in enumerate(text_lists):
+            kept = [sent for sent in text_list if not self.hashes.add(hash64('{}\x00{}'.format(i, sent.strip())))]
+            self.seen_cnts[i] += len(text_list)
+            self.dup_cnts[i] += len(text_list) - len(kept)
+            deduped.append(kept)
+        return deduped
+
+    @property
+    def persistent(self):
+        """Whether the whole state is kept on disk, so that a scrape can resume with it."""
+        return isinstance(self.hashes, DiskHashSet) and self.near_dups is None
+
+    def checkpoint(self, position=0):
+        """Commit the hashes on disk, tagged with the journal `position` of the progress they belong to."""
+        if isinstance(self.hashes, DiskHashSet):
+            self.hashes.commit(position)
+
+    def rollback(self, position):
+        """Drop the hashes on disk committed at or after journal `position`, to resume from there."""
+        if isinstance(self.hashes, DiskHashSet):
+            self.hashes.rollback(position)
+
+    def settle(self):
+        """Keep the hashes on disk through the rollbacks of a new journal."""
+        if isinstance(self.hashes, DiskHashSet):
+            self.hashes.settle()
+
+    def close(self):
+        self.checkpoint()
+
+    def report(self):
+        """Print the duplicate rate of each class."""
+        for i, (seen, dups) in enumerate(zip(self.seen_cnts, self.dup_cnts)):
+            rate = dups / float(seen) if seen else 0.
+            logger.info('Dedup class {}: {} of {} sentences dropped ({:.1%}).'.format(i, dups, seen, rate))
+        if self.near_dups is not None:
+            logger.info('Dedup: {} near-duplicate papers dropped.'.format(self.near_dup_papers))
@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+from contextlib import closing
+from urllib.parse import urlsplit, urldefrag
+
+from .dedup import hash64, DiskHashSet
+from .file_utils import download_pdf, MAX_PDF_BYTES
+from .utils import iter_ahead
+
+
+logger = logging.getLogger(__name__)
+
+
+class PdfFetcher(object):
+    """
+    Downloads PDFs concurrently, at most `max_per_domain` at a time from each domain,
+    and remembers the URLs already fetched, across queries and, with `seen_path`,
+    across scrapes, so that each PDF is downloaded once. URLs are marked as fetched
+    once yielded, so those cancelled when the caller stops early are fetched later.
+    Failed URLs are only remembered for this scrape, so they are retried by the next one.
+
+    Paramters
+    ---------
+    scraper: Scraper
+        Provides the HTTP client, the rate governor and the metrics.
+    n_workers: int
+        Number of PDFs downloaded concurrently. Default: 1.
+    max_per_domain: int
+        Maximum number of concurrent downloads from a domain. Default: 2.
+    max_bytes: int
+        PDFs larger than this are skipped. Default: 50 MB.
+    seen_path: str
+        SQLite file of the successfully fetched URLs, kept between scrapes. Default: None (this scrape only).
+    """
+
+    def __init__(self, scraper, n_workers=1, max_per_domain=2, max_bytes=MAX_PDF_BYTES, seen_path=None):
+        self.scraper = scraper
+        self.n_workers = max(1, int(n_workers))
+        self.max_per_domain = max_per_domain
+        self.max_bytes = max_bytes
+        self.disk_seen = DiskHashSet(seen_path) if seen_path is not None else None
+        self.seen = set()
+        self.domains = {}
+        self.lock = threading.Lock()
+        self.pool = None
+
+    def key(self, url):
+        return hash64(urldefrag(url)[0])
+
+    def is_seen(self, h):
+        return h in self.seen or (self.disk_seen is not None and h in self.disk_seen)
+
+    def mark_seen(self, url, persist=True):
+        h = self.key(url)
+        self.seen.add(h)
+        if persist and self.disk_seen is not None:
+            self.disk_seen.add(h)
+
+    def new_urls(self, urls):
+        """The URLs of `urls` not fetched before, in order and without repeats."""
+        new, keys = [], set()
+        for url in urls:
+            h = self.key(url)
+            if self.is_seen(h) or h in keys:
+                self.scraper.metrics.inc('skipped_pdfs', reason='seen')
+            else:
+                keys.add(h)
+                new.append(url)
+        return new
+
+    def domain_slot(self, url):
+        domain = urlsplit(url).hostname
+        with self.lock:
+            if domain not in self.domains:
+                self.domains[domain] = threading.BoundedSemaphore(self.max_per_domain)
+            return self.domains[domain]
+
+    def fetch(self, url):
+        """Download `url`. Returns its bytes or None, and the seconds taken."""
+        with self.domain_slot(url):
+            logger.info('download {}'.format(url))
+            t0 = time.perf_counter()
+            bin = download_pdf(url, client=self.scraper.http, governor=self.scraper.governor, max_bytes=self.max_bytes)
+            return bin or None, time.perf_counter() - t0
+
+    def iter_fetch(self, urls):
+        """
+        Yield `(url, bin)` for each of `urls` in order, where `bin` is None if the download
+        failed, and mark the URL as fetched. Up to `2 * n_workers` PDFs are downloaded
+        ahead of the caller, and the pending downloads are cancelled if it stops early.
+        """
+        if self.n_workers == 1:
+            for url in urls:
+                bin = self.observe(url, *self.fetch(url))
+                yield url, bin
+            return
+
+        if self.pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.pool = ThreadPoolExecutor(max_workers=self.n_workers)
+        submit = lambda url: self.pool.submit(self.fetch, url)
+        with closing(iter_ahead(self.pool, urls, submit, 2 * self.n_workers, shutdown=False)) as downloads:
+            for url, future in downloads:
+                bin, seconds = future.result()
+                yield url, self.observe(url, bin, seconds)
+
+    def observe(self, url, bin, seconds):
+        # A failed download may never succeed, skip it for the rest of this scrape only
+        self.mark_seen(url, persist=bin is not None)
+        if bin is not None:
+            self.scraper.metrics.observe('request_seconds', seconds, kind='pdf')
+            self.scraper.metrics.inc('fetched_bytes', len(bin), kind='pdf')
+        return bin
+
+    def commit(self):
+        if self.disk_seen is not None:
+            self.disk_seen.commit()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        self.commit()
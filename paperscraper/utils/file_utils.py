@@ -1,15 +1,30 @@
 import gzip
+import logging
 import tarfile
-from io import BytesIO
+import zlib
+from io import BytesIO, StringIO
 import os
+import re
 import shutil
-from urllib.request import urlopen
+import time
+from http.client import HTTPException
+from socket import error as SocketError
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
 
-from .latex_utils import text_from_latex
+from .governor import CircuitOpenError, parse_retry_after
+from .http import default_client
+from .latex_utils import text_from_latex, text_from_latex_stream
 from .pdf_utils import text_from_pdf
 from .utils import always_true
 
 
+logger = logging.getLogger(__name__)
+
+MAX_PDF_BYTES = 50 * 1024 ** 2
+OLD_STYLE_ID = re.compile(r'^([a-z\-]+(?:\.[A-Z]{2})?)(\d{7})$')
+
+
 def save_tar(bin, output_file='/tmp/temp.tar.gz'):
     try:
         compressed_f = BytesIO()
@@ -21,7 +36,7 @@ def save_tar(bin, output_file='/tmp/temp.tar.gz'):
             fout.write(decompressed_f.read())
         return output_file
     except Exception as e:
-        print(e)
+        logger.warning(e)
         return False
 
 def untar(fpath, output_dir='/tmp/temp', exist_ok=True, exts=['']):
@@ -41,21 +56,108 @@ def untar(fpath, output_dir='/tmp/temp', exist_ok=True, exts=['']):
                 tar.extractall(members=select_members(tar), path=output_dir)
 
         except Exception as e:
-            print(e)
+            logger.warning(e)
             return False
 
         return output_dir
     return False
 
-def download_pdf(url, output_file='/tmp/temp.pdf'):
-    if has_ext(url, ['pdf']):
+def read_text(bin):
+    return StringIO(bin.decode('utf-8', errors='ignore'), newline=None)
+
+def iter_eprint_files(bin, exts=['']):
+    """
+    Yield `(name, text stream)` for each file in e-print `bin` with one of `exts`,
+    streaming the gzipped body through tarfile without writing to disk.
+    An e-print that is a single gzipped file rather than a tar is taken as one `.tex` file.
+    """
+    try:
+        tar = tarfile.open(fileobj=BytesIO(bin), mode='r|gz')
+    except tarfile.ReadError:
+        # Not a tar, single gzipped file
+        if has_ext('main.tex', exts=exts):
+            yield 'main.tex', read_text(gzip.decompress(bin))
+        return
+
+    with tar:
+        for tarinfo in tar:
+            if tarinfo.isfile() and has_ext(tarinfo.name, exts=exts):
+                yield tarinfo.name, read_text(tar.extractfile(tarinfo).read())
+
+def eprint_id(member_name):
+    """The arXiv id of a source shard member, e.g. '0301/astro-ph0301001.gz' -> 'astro-ph/0301001'."""
+    name = os.path.basename(member_name).split('.gz')[0]
+    name = name[:-len('.pdf')] if name.endswith('.pdf') else name
+    match = OLD_STYLE_ID.match(name)
+    if match:
+        return '{}/{}'.format(*match.groups())
+    return name
+
+def iter_source_shard(path):
+    """
+    Yield `(id, bin)` for each e-print in an arXiv source shard, a tar of gzipped
+    e-prints, streaming the tar without unpacking it. `bin` is None for members
+    that are not gzipped e-prints, e.g. the PDFs of PDF-only submissions.
+    """
+    with tarfile.open(path, mode='r|*') as tar:
+        for tarinfo in tar:
+            if not tarinfo.isfile():
+                continue
+            id = eprint_id(tarinfo.name)
+            if has_ext(tarinfo.name, ['gz']):
+                yield id, tar.extractfile(tarinfo).read()
+            else:
+                yield id, None
+
+def download_pdf(url, output_file=None, client=None, timeout=None, governor=None, max_bytes=MAX_PDF_BYTES):
+    """
+    Download the PDF at `url`. Returns its bytes, or the path `output_file` it is
+    written to if given, or False if the download failed or the PDF is larger
+    than `max_bytes`. `timeout` defaults to the timeout of the client.
+    """
+    if has_ext(urlsplit(url).path, ['pdf']):
+        client = client if client is not None else default_client()
+        host = urlsplit(url).hostname
         try:
-            with open(output_file, 'wb') as fout:
-                res = urlopen(url, timeout=1)
-                fout.write(res.read())
+            if governor is not None:
+                governor.acquire(host)
+            with client.urlopen(url, timeout=timeout) as res:
+                length = res.getheader('Content-Length')
+                if length is not None and length.isdigit() and int(length) > max_bytes:
+                    logger.warning('Skip {}, {} bytes is larger than {} bytes.'.format(url, length, max_bytes))
+                    return False
+                bin = res.read(max_bytes + 1)
+            if len(bin) > max_bytes:
+                logger.warning('Skip {}, larger than {} bytes.'.format(url, max_bytes))
+                return False
+        except CircuitOpenError as e:
+            logger.warning(e)
+            return False
+        except HTTPError as e:
+            logger.warning('HTTPError: {} ({})'.format(e, url))
+            if governor is not None:
+                if e.code == 503:
+                    governor.throttle(host, parse_retry_after(e.headers.get('Retry-After')) if e.headers else None)
+                elif e.code >= 500:
+                    governor.failure(host)
+            return False
+        except (SocketError, HTTPException) as e:
+            logger.warning('{}: {} ({})'.format(type(e).__name__, e, url))
+            if governor is not None:
+                if getattr(e, 'errno', None) == 104:
+                    governor.throttle(host)
+                else:
+                    governor.failure(host)
+            return False
         except Exception as e:
-            print(e)
+            logger.warning(e)
             return False
+        if governor is not None:
+            governor.success(host)
+        if output_file is None:
+            return bin
+        with open(output_file, 'wb') as fout:
+            fout.write(bin)
         return output_file
     return False
 
@@ -72,7 +174,7 @@ def save_classified_text(text_lists, save_to, append=False):
     for text_list, save_path in zip(text_lists, save_to):
         save_text(text_list, save_path, append=append)
 
-def extract_text_from_file(fpath, classifications=None, meta=None, is_class=None, filter_text=always_true):
+def extract_text_from_file(fpath, classifications=None, meta=None, is_class=None, filter_text=always_true, gazetteer=None):
     if classifications is None:
         classifications = [always_true] # return all text as one class
         is_class = [True]
@@ -85,12 +187,64 @@ def extract_text_from_file(fpath, classifications=None, meta=None, is_class=None
         if fpath.endswith('tex'):
             text_lists, is_class = text_from_latex(
                 fpath, classifications=classifications, meta=meta,
-                is_class=is_class, filter_text=filter_text)
+                is_class=is_class, filter_text=filter_text, gazetteer=gazetteer)
         elif fpath.endswith('pdf'):
             text_lists = text_from_pdf(fpath, filter_text=filter_text)
     return text_lists, is_class
 
-def extract_text(path, exts=[''], classifications=None, meta=None, filter_text=always_true):
+def extract_text_from_eprint(bin, exts=[''], classifications=None, meta=None, filter_text=always_true, gazetteer=None,
+    timings=None
+):
+    """
+    Same as `extract_text` on the decompressed e-print, but reads the files
+    of the e-print `bin` in memory. Returns False if `bin` is not a valid e-print.
+    If a dict `timings` is given, the seconds spent decompressing and extracting
+    text are added to its 'decompress' and 'extract' keys.
+    """
+    if classifications is None:
+        classifications = [always_true] # return all text as one class
+
+    n_classes = len(classifications)
+    text_lists = [[] for _ in range(n_classes)]
+    is_class = [True for i in range(n_classes)]
+    if timings is None:
+        timings = {}
+    timings.setdefault('decompress', 0.)
+    timings.setdefault('extract', 0.)
+
+    t = time.perf_counter()
+    try:
+        for fname, fin in iter_eprint_files(bin, exts=exts):
+            t_read = time.perf_counter()
+            timings['decompress'] += t_read - t
+            if not fname.endswith('tex'):
+                t = time.perf_counter()
+                continue
+            this_text_lists, is_class = text_from_latex_stream(
+                fin, classifications=classifications, meta=meta,
+                is_class=is_class, filter_text=filter_text, gazetteer=gazetteer
+            )
+            t = time.perf_counter()
+            timings['extract'] += t - t_read
+
+            # If documents does not pass any classification, return nothing
+            if not any(is_class):
+                return []
+
+            for i in range(n_classes):
+                text_lists[i] += this_text_lists[i]
+        timings['decompress'] += time.perf_counter() - t
+    except (tarfile.TarError, OSError, EOFError, zlib.error) as e:
+        logger.warning(e)
+        return False
+
+    # Remove text of invalid classes
+    for i, c in enumerate(is_class):
+        if not c:
+            text_lists[i] = []
+    return text_lists
+
+def extract_text(path, exts=[''], classifications=None, meta=None, filter_text=always_true, gazetteer=None):
     if classifications is None:
         classifications = [always_true] # return all text as one class
 
@@ -106,7 +260,7 @@ def extract_text(path, exts=[''], classifications=None, meta=None, filter_text=a
                     fpath = os.path.join(dpath, fname)
                     this_text_lists, is_class = extract_text_from_file(
                         fpath, classifications=classifications, meta=meta,
-                        is_class=is_class, filter_text=filter_text
+                        is_class=is_class, filter_text=filter_text, gazetteer=gazetteer
                     )
 
                     # If documents does not pass any classification, return nothing
@@ -120,7 +274,7 @@ def extract_text(path, exts=[''], classifications=None, meta=None, filter_text=a
         if has_ext(path, exts=exts):
             text_lists, is_class = extract_text_from_file(
                 path, classifications=classifications, meta=meta,
-                is_class=is_class, filter_text=filter_text)
+                is_class=is_class, filter_text=filter_text, gazetteer=gazetteer)
     # Not valid path
     else:
         return False
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host that keeps failing."""
+
+    def __init__(self, host, until):
+        super(CircuitOpenError, self).__init__(
+            'Too many consecutive failures of {}, not sending requests for {:.0f} seconds.'.format(host, until - time.time()))
+        self.host = host
+        self.until = until
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date, or None."""
+    if not value:
+        return None
+    try:
+        return max(0., float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0., parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateGovernor(object):
+    """
+    Paces the requests to each host with a token bucket, shared by all threads, and
+    by all processes on the host if `state_path` is given (the state is kept in that
+    file under an exclusive `fcntl` lock).
+
+    When a host throttles (503, connection reset), its rate is multiplied by
+    `decrease` and no request is sent until its Retry-After, if any, has passed.
+    Each success raises the rate again by `recovery`, up to `rate`, or lifts the
+    limit again if `rate` is None. After
+    `max_failures` consecutive failures the circuit opens: `acquire` raises
+    `CircuitOpenError` for `cooldown` seconds, then lets requests through again,
+    and the next failure opens it again.
+
+    Paramters
+    ---------
+    rate: float
+        Maximum requests per second to a host. None for no limit. Default: 1.
+    burst: int
+        Requests that can be sent at once after an idle period. Default: 4.
+    min_rate: float
+        Minimum requests per second after slowing down. Default: one per minute.
+    decrease: float
+        Factor of the rate after a throttled request. Default: 0.5.
+    recovery: float
+        Factor of the rate after a successful request. Default: 1.1.
+    max_failures: int
+        Consecutive failures opening the circuit. Default: 10.
+    cooldown: float
+        Seconds the circuit stays open. Default: 300.
+    state_path: str
+        File of the state shared between processes. Default: None (this process only).
+    """
+
+    def __init__(self, rate=1., burst=4, min_rate=1 / 60., decrease=0.5, recovery=1.1,
+        max_failures=10, cooldown=300, state_path=None
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate if rate is None else min(min_rate, rate)
+        self.decrease = decrease
+        self.recovery = recovery
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.state_path = state_path
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def new_state(self, now):
+        return {'tokens': self.burst, 'updated': now, 'rate': self.rate,
+            'blocked_until': 0., 'failures': 0, 'open_until': 0.}
+
+    @contextmanager
+    def host_state(self, host):
+        """The state of `host`, locked for this thread and, with `state_path`, other processes."""
+        with self.lock:
+            if self.state_path is None:
+                if host not in self.states:
+                    self.states[host] = self.new_state(time.time())
+                yield self.states[host]
+                return
+
+            import fcntl # only where processes share the state
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                with os.fdopen(os.dup(fd), 'r+') as f:
+                    try:
+                        states = json.loads(f.read() or '{}')
+                    except ValueError:
+                        states = {}
+                    if host not in states:
+                        states[host] = self.new_state(time.time())
+                    yield states[host]
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(states))
+            finally:
+                os.close(fd) # releases the lock
+
+    def acquire(self, host):
+        """Wait until a request can be sent to `host`. Returns the seconds waited."""
+        waited = 0.
+        while True:
+            with self.host_state(host) as state:
+                now = time.time()
+                if state['open_until'] > now:
+                    raise CircuitOpenError(host, state['open_until'])
+
+                wait = state['blocked_until'] - now
+                if state['rate'] is None:
+                    if wait <= 0:
+                        return waited
+                else:
+                    state['tokens'] = min(self.burst, state['tokens'] + (now - state['updated']) * state['rate'])
+                    state['updated'] = now
+                    if wait <= 0 and state['tokens'] >= 1:
+                        state['tokens'] -= 1
+                        return waited
+                    wait = max(wait, (1 - state['tokens']) / state['rate'])
+            time.sleep(wait)
+            waited += wait
+
+    def success(self, host):
+        with self.host_state(host) as state:
+            state['failures'] = 0
+            if self.rate is None:
+                state['rate'] = None
+            elif state['rate'] is not None:
+                state['rate'] = min(self.rate, state['rate'] * self.recovery)
+
+    def throttle(self, host, retry_after=None):
+        """`host` asked to slow down, for `retry_after` seconds if given."""
+        with self.host_state(host) as state:
+            now = time.time()
+            rate = state['rate'] if state['rate'] is not None else self.burst
+            state['rate'] = max(self.min_rate, rate * self.decrease)
+            if retry_after is None:
+                retry_after = 1 / state['rate']
+            state['blocked_until'] = max(state['blocked_until'], now + retry_after)
+            self._fail(state, now)
+
+    def failure(self, host):
+        """A request to `host` failed without the host asking to slow down."""
+        with self.host_state(host) as state:
+            self._fail(state, time.time())
+
+    def _fail(self, state, now):
+        state['failures'] += 1
+        if state['failures'] >= self.max_failures:
+            state['open_until'] = now + self.cooldown
+
+
+_default_governor = None
+_default_lock = threading.Lock()
+
+def default_governor():
+    """The `RateGovernor` shared by all scrapers of the process that are not given one."""
+    global _default_governor
+    with _default_lock:
+        if _default_governor is None:
+            _default_governor = RateGovernor()
+        return _default_governor
@@ -0,0 +1,256 @@
+import base64
+import http.client
+import threading
+import zlib
+from io import BytesIO
+from urllib.error import HTTPError
+from urllib.parse import urlsplit, urljoin, unquote
+from urllib.request import getproxies, proxy_bypass_environment
+
+
+USER_AGENT = 'paperscraper'
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# Errors of a kept-alive connection closed by the server while it was idle
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+    ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+class HttpResponse(object):
+    """
+    A response of `HttpClient`, read like the response of `urlopen`.
+    The body is decompressed while it is read if it was requested compressed.
+    The connection goes back to its pool once the body is read to the end.
+    """
+
+    def __init__(self, client, key, conn, response, url, decode=False):
+        self.client = client
+        self.key = key
+        self.conn = conn
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+
+        encoding = (response.getheader('Content-Encoding') or '').lower() if decode else ''
+        if encoding in ('gzip', 'x-gzip'):
+            self.decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self.decoder = zlib.decompressobj()
+        else:
+            self.decoder = None
+        self.buffer = b''
+        self.eof = False
+
+    def getheader(self, name, default=None):
+        return self.response.getheader(name, default)
+
+    def geturl(self):
+        return self.url
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = [self.buffer]
+            while not self.eof:
+                chunks.append(self._read_chunk(-1))
+            data = b''.join(chunks)
+            self.buffer = b''
+            return data
+
+        while len(self.buffer) < size and not self.eof:
+            self.buffer += self._read_chunk(size)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def _read_chunk(self, size):
+        data = self.response.read() if size < 0 else self.response.read(size)
+        if not data or self.response.isclosed():
+            self.eof = True
+        if self.decoder is not None:
+            data = self.decoder.decompress(data)
+            if self.eof:
+                data += self.decoder.flush()
+        if self.eof:
+            self._release()
+        return data
+
+    def _release(self):
+        if self.conn is not None:
+            self.client.release(self.key, self.conn, reusable=self.eof and not self.response.will_close)
+            self.conn = None
+
+    def close(self):
+        self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class HttpClient(object):
+    """
+    An HTTP client keeping connections alive in a pool per host, so that
+    consecutive requests to a host skip the TCP and TLS handshakes.
+    It is safe to share between threads. Like `urlopen`, it goes through the
+    proxies of the `http_proxy` and `https_proxy` environment variables, except
+    for the hosts of `no_proxy`; HTTPS is tunnelled through the proxy with CONNECT.
+
+    Paramters
+    ---------
+    timeout: float
+        Seconds to wait for connecting and for each read of a response. Default: 30.
+    max_per_host: int
+        Maximum number of idle connections kept per host. Default: 8.
+    max_redirects: int
+        Maximum number of redirects followed. Default: 5.
+    user_agent: str
+        User-Agent header of the requests, unless given in the request headers.
+    proxies: dict
+        Proxy URLs by scheme, e.g. {'https': 'http://proxy:3128', 'no': 'localhost'},
+        as returned by `urllib.request.getproxies`. Default: the proxies of the environment.
+        Pass {} not to use any proxy.
+    """
+
+    def __init__(self, timeout=30, max_per_host=8, max_redirects=5, user_agent=USER_AGENT, proxies=None):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_redirects = max_redirects
+        self.user_agent = user_agent
+        self.proxies = getproxies() if proxies is None else proxies
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def connection(self, key, timeout):
+        """Return an idle connection to host `key` and whether it was reused, or a new one."""
+        with self.lock:
+            idle = self.pools.get(key)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        return self.new_connection(key, timeout), False
+
+    def proxy(self, parts):
+        """The proxy URL for the split URL `parts`, or None to connect directly."""
+        proxy = self.proxies.get(parts.scheme)
+        if not proxy or proxy_bypass_environment(parts.hostname, self.proxies):
+            return None
+        return proxy if '://' in proxy else 'http://' + proxy
+
+    def new_connection(self, key, timeout):
+        scheme, host, port, proxy = key
+        if proxy is None:
+            if scheme == 'https':
+                return http.client.HTTPSConnection(host, port, timeout=timeout)
+            return http.client.HTTPConnection(host, port, timeout=timeout)
+
+        proxy_parts = urlsplit(proxy)
+        headers = proxy_headers(proxy_parts)
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(proxy_parts.hostname, proxy_parts.port, timeout=timeout)
+            conn.set_tunnel(host, port, headers=headers)
+            return conn
+        return http.client.HTTPConnection(proxy_parts.hostname, proxy_parts.port, timeout=timeout)
+
+    def release(self, key, conn, reusable=True):
+        if reusable:
+            with self.lock:
+                idle = self.pools.setdefault(key, [])
+                if len(idle) < self.max_per_host:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def request(self, url, headers=None, compressed=False, timeout=None):
+        """
+        GET `url` and return an `HttpResponse`, following redirects.
+        With `compressed`, a gzipped response is asked for and decompressed while it is read.
+        Raises `HTTPError` for error statuses, like `urlopen`.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        request_headers = {'User-Agent': self.user_agent}
+        if compressed:
+            request_headers['Accept-Encoding'] = 'gzip, deflate'
+        # Header names are case-insensitive, urllib's Request stores them as e.g. 'User-agent'
+        request_headers.update({name.title(): value for name, value in (headers or {}).items()})
+
+        for _ in range(self.max_redirects + 1):
+            parts = urlsplit(url)
+            proxy = self.proxy(parts)
+            key = (parts.scheme, parts.hostname, parts.port, proxy)
+            path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+            send_headers = request_headers
+            if proxy is not None and parts.scheme == 'http':
+                # A plain HTTP proxy is sent the absolute URL
+                path = '{}://{}{}'.format(parts.scheme, parts.netloc, path)
+                send_headers = dict(request_headers, **proxy_headers(urlsplit(proxy)))
+
+            conn, reused = self.connection(key, timeout)
+            try:
+                response = self.send(conn, path, send_headers)
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # The server closed the idle connection, retry once on a new one
+                conn = self.new_connection(key, timeout)
+                response = self.send(conn, path, send_headers)
+
+            if response.status in REDIRECT_CODES and response.getheader('Location'):
+                response.read()
+                self.release(key, conn, reusable=not response.will_close)
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            if response.status >= 400:
+                body = response.read()
+                self.release(key, conn, reusable=not response.will_close)
+                raise HTTPError(url, response.status, response.reason, response.msg, BytesIO(body))
+            return HttpResponse(self, key, conn, response, url, decode=compressed)
+
+        raise HTTPError(url, response.status, 'Too many redirects', response.msg, None)
+
+    def send(self, conn, path, headers):
+        try:
+            conn.request('GET', path, headers=headers)
+            return conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def urlopen(self, req, timeout=None, compressed=False):
+        """Same as `request`, also taking a `urllib.request.Request` like `urlopen`."""
+        if hasattr(req, 'get_full_url'):
+            return self.request(req.get_full_url(), headers=dict(req.header_items()),
+                compressed=compressed, timeout=timeout)
+        return self.request(req, compressed=compressed, timeout=timeout)
+
+    def close(self):
+        """Close all idle connections."""
+        with self.lock:
+            pools, self.pools = self.pools, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+
+def proxy_headers(proxy_parts):
+    """The Proxy-Authorization header for the user and password of a split proxy URL, if any."""
+    if proxy_parts.username is None:
+        return {}
+    credentials = '{}:{}'.format(unquote(proxy_parts.username), unquote(proxy_parts.password or ''))
+    return {'Proxy-Authorization': 'Basic ' + base64.b64encode(credentials.encode()).decode('ascii')}
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def default_client():
+    """The `HttpClient` shared by all scrapers of the process that are not given one."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,95 @@
+import json
+import os
+
+
+class JournalState(object):
+    """Progress of a text scrape as recorded in its journal."""
+
+    def __init__(self, n_classes):
+        self.sent_cnts = [0] * n_classes
+        self.offsets = []           # positions of the output sinks
+        self.log_offset = None      # position of the log sink
+        self.done_chunks = set()    # completed date chunks
+        self.chunk = None           # date chunk in progress
+        self.chunk_ids = []         # ids scraped in the chunk in progress
+        self.chunk_extracted_ids = [[] for _ in range(n_classes)]
+
+
+class Journal(object):
+    """
+    A durable progress journal of a text scrape, written as JSON lines.
+
+    An entry is appended and flushed at each checkpoint of the sinks, every few
+    e-prints, with the ids of the e-prints since the previous entry, the classes
+    each was extracted to, the sentence counts per class, and the checkpointed
+    positions of the output and log sinks at that point. Another entry marks each
+    completed date chunk. If the scrape is killed, `load` returns the last
+    consistent progress, and the sinks can be truncated back to it; the e-prints
+    after the last entry are scraped again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fout = None
+        self.valid_size = 0
+
+    def load(self, n_classes):
+        """Return the recorded `JournalState`, or None if nothing was recorded."""
+        if not os.path.isfile(self.path):
+            return None
+
+        state = None
+        self.valid_size = 0
+        with open(self.path, 'rb') as fin:
+            for line in fin:
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError: # torn write of the last entry
+                    break
+                self.valid_size += len(line)
+
+                if entry['type'] == 'start':
+                    state = JournalState(n_classes)
+                elif entry['type'] == 'papers':
+                    chunk = tuple(entry['chunk'])
+                    if chunk != state.chunk:
+                        state.chunk = chunk
+                        state.chunk_ids = []
+                        state.chunk_extracted_ids = [[] for _ in range(n_classes)]
+                    for id, extracted in zip(entry['ids'], entry['extracted']):
+                        state.chunk_ids.append(id)
+                        for i in extracted:
+                            state.chunk_extracted_ids[i].append(id)
+                elif entry['type'] == 'chunk':
+                    state.done_chunks.add(tuple(entry['chunk']))
+                    state.chunk = None
+                    state.chunk_ids = []
+                    state.chunk_extracted_ids = [[] for _ in range(n_classes)]
+                state.sent_cnts = entry['sent_cnts']
+                state.offsets = entry['offsets']
+                state.log_offset = entry['log_offset']
+        return state
+
+    def open(self, resume=False):
+        """Start a new journal, or continue the loaded one if `resume`."""
+        if resume:
+            with open(self.path, 'ab') as fout:
+                fout.truncate(self.valid_size)
+            self.fout = open(self.path, 'a')
+        else:
+            self.fout = open(self.path, 'w')
+
+    def close(self):
+        if self.fout is not None:
+            self.fout.close()
+            self.fout = None
+
+    def tell(self):
+        """Position of the next entry in the journal file."""
+        return self.fout.tell()
+
+    def write(self, type, **entry):
+        entry['type'] = type
+        self.fout.write(json.dumps(entry) + '\n')
+        self.fout.flush()
+
@@ -1,62 +1,152 @@
 import re
 import os
+from collections import Counter
 
 from .utils import always_true, split_sent
 
 
-def find_institutes(text):
-    text = ' '.join(text.strip().split())
+BRACKETS = {'{': re.compile(r'[{}]'), '[': re.compile(r'[\[\]]')}
+SPECIAL = re.compile(r'[\\~$\[{%]')
+COMMAND_NAME = re.compile(r'[a-zA-Z@]+')
+
+IN_BRACKETS = re.compile(r'{.*}')
+INSTITUTE = re.compile(r'(?<=[^a-zA-Z\s])([a-zA-Z\s]*(?:University|Institute|College)[a-zA-Z\s]*)(?=[^a-zA-Z\s])')
+WORD = re.compile(r'[a-z]+')
+
+
+class InstituteGazetteer(object):
+    """
+    Known institution names held in a trie of lower-cased words,
+    to find institutes that the title patterns of `find_institutes` miss.
+    """
 
-    institutes = []
-    institute_titles = [r'University', r'Institute', r'College']
-    for title in institute_titles:
-        pattern = r'{.*}'
-        in_brackets = re.findall(pattern, text)
-        for in_bracket in in_brackets:
-            pattern = r'[^a-zA-Z\s]([a-zA-Z\s]*' + title + r'[a-zA-Z\s]*)[^a-zA-Z\s]'
-            institutes += re.findall(pattern, text)
+    def __init__(self, names):
+        self.trie = {}
+        for name in names:
+            words = WORD.findall(name.lower())
+            if not words:
+                continue
+            node = self.trie
+            for word in words:
+                node = node.setdefault(word, {})
+            node[''] = ' '.join(words) # end of a name
 
-    institutes = [clean_text(ins).lower() for ins in institutes]
+    @classmethod
+    def load(cls, fpath):
+        """Load names from a file with one name per line."""
+        with open(fpath, 'r', errors='ignore') as fin:
+            return cls(line.strip() for line in fin if line.strip())
+
+    def find(self, text):
+        """Return the longest known names in `text`, scanning its words once."""
+        words = WORD.findall(text.lower())
+        names = []
+        i = 0
+        while i < len(words):
+            node = self.trie
+            name, end = None, i
+            for j in range(i, len(words)):
+                node = node.get(words[j])
+                if node is None:
+                    break
+                if '' in node:
+                    name, end = node[''], j + 1
+            if name is None:
+                i += 1
+            else:
+                names.append(name)
+                i = end
+        return names
+
+
+def find_institutes(text, gazetteer=None):
+    """
+    Return a Counter of the institutes found in a paragraph.
+    Institutes are text segments containing a title such as University,
+    in paragraphs with brackets, e.g. \affiliation{...}, or names of
+    the `InstituteGazetteer` if any.
+    """
+    text = ' '.join(text.strip().split())
+
+    institutes = Counter()
+    if IN_BRACKETS.search(text):
+        institutes.update(clean_text(ins).lower() for ins in INSTITUTE.findall(text))
+    if gazetteer is not None:
+        # Names already found by the title patterns are not counted twice
+        matched = set(institutes)
+        institutes.update(name for name in gazetteer.find(text) if name not in matched)
     return institutes
 
-def clean_text(text):
-    def remove_pattern(pattern, text, clean, flags=0):
-        # Cut on text too long, probably something wrong and unuseful
-        if len(text) > 2000:
-            return '', True
-
-        r = re.search(pattern, text, flags)
-        if text != '' and r:
-            s, e = r.span()
-            text = text[:s] + text[e:]
-            # Recursively remove
-            return remove_pattern(pattern, text, False, flags)
-        return text, clean
+def match_brackets(text, open_char):
+    """Map the index of each opening bracket to the index of its matching closing bracket."""
+    closes = {}
+    stack = []
+    for m in BRACKETS[open_char].finditer(text):
+        if m.group() == open_char:
+            stack.append(m.start())
+        elif stack:
+            closes[stack.pop()] = m.start()
+    return closes
 
+def clean_text(text):
+    """
+    Remove commands (with their arguments and the following whitespace),
+    inline and display math, bracket groups and comments in one left-to-right pass.
+    """
     text = ' '.join(text.strip().split())
-    text += '\n'
-    clean = False
-    while not clean:
-        clean = True
-        # Remove commands
-        text, clean = remove_pattern(r'~?\\.*?{[^{]*?}[\s$]+', text, clean, re.MULTILINE)
-        text, clean = remove_pattern(r'~?\\.*?\[[^\[]*?\][\s$]+', text, clean, re.MULTILINE)
-        text, clean = remove_pattern(r'~?\\.*?[\s$]+', text, clean, re.MULTILINE)
-        # Remove math
-        text, clean = remove_pattern(r'\$\$.*?\$\$', text, clean, re.MULTILINE) # remove this first so the next one won't find $$
-        text, clean = remove_pattern(r'\$.*?\$', text, clean, re.MULTILINE)
-        # Remove brackets
-        text, clean = remove_pattern(r'\[[^\[]*?\]', text, clean, re.MULTILINE)
-        text, clean = remove_pattern(r'{[^{]*?}', text, clean, re.MULTILINE)
-        # Remove comments
-        text, clean = remove_pattern(r'%.*$', text, clean, re.MULTILINE)
-
-    return text.strip()
-
-def text_from_latex(fpath, classifications=None, meta=None, is_class=None, filter_text=always_true):
+    closes = match_brackets(text, '{')
+    closes.update(match_brackets(text, '['))
+
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        m = SPECIAL.search(text, i)
+        if m is None:
+            out.append(text[i:])
+            break
+        out.append(text[i:m.start()])
+        i = m.start()
+        c = text[i]
+
+        if c == '\\' or (c == '~' and text.startswith('\\', i + 1)):
+            # Command: name, arguments up to the next whitespace, then the whitespace
+            i += 2 if c == '~' else 1
+            name = COMMAND_NAME.match(text, i)
+            i = name.end() if name else min(i + 1, n) # or an escaped character, e.g. \%
+            if text[i - 1] != '$': # \$ has no arguments
+                while i < n and text[i] not in ' $':
+                    i = closes[i] + 1 if i in closes else i + 1
+            while i < n and text[i] == ' ':
+                i += 1
+        elif c == '$':
+            # Math: display math first, so $$ is not taken as an empty inline math
+            e = text.find('$$', i + 2) if text.startswith('$$', i) else -1
+            if e >= 0:
+                i = e + 2
+            else:
+                e = text.find('$', i + 1)
+                if e < 0:
+                    out.append(c)
+                    i += 1
+                else:
+                    i = e + 1
+        elif c in '{[' and i in closes:
+            # Bracket group with its content
+            i = closes[i] + 1
+        elif c == '%':
+            # Comment till the end of the paragraph, as lines are joined
+            break
+        else:
+            out.append(c)
+            i += 1
+
+    return ''.join(out).strip()
+
+def text_from_latex(fpath, classifications=None, meta=None, is_class=None, filter_text=always_true, gazetteer=None):
     """
     Extract from sections and subsections.
     Remove latex specific tokens.
+    Institutes passed to the classifications are counted by `find_institutes`.
     """
     if classifications is None:
         classifications = [lambda x: True] # return all text as one class
@@ -67,46 +157,65 @@ def text_from_latex(fpath, classifications=None, meta=None, is_class=None, filte
     n_classes = len(classifications)
     text_lists = [[] for _ in range(n_classes)]
     if os.path.isfile(fpath):
-        text_list = []
-        institutes = []
-        something_begins = 0
-        is_main_file = False # has \documentclass
-        text = ''
         with open(fpath, 'r', errors='ignore') as fin:
-            for line in fin:
-                # Flag a skip segment
-                if '\begin' in line:
-                    something_begins += 1
-                # End a skip segment
-                elif something_begins and '\end' in line:
-                    something_begins -= 1
-                # Read text in chunks of paragraphs
-                elif something_begins == 0:
-                    if line != '\n':
-                        text += line
-                    else:
-                        is_main_file |= '\documentclass' in text
-
-                        # Find institutes/universities
-                        if is_main_file:
-                            institutes += find_institutes(text)
-
-                        cleaned_text = clean_text(text)
-                        sents = split_sent(cleaned_text)
-                        text_list += [sent for sent in sents if filter_text(sent)]
-                        text = ''
-        if text != '':
-            cleaned_text = clean_text(text)
-            sents = split_sent(cleaned_text)
-            text_list += [sent for sent in sents if filter_text(sent)]
-            text = ''
-        
-        # Classify the text
-        for i, filt in enumerate(classifications):
-            if is_class[i]:
-                if filt((text_list, institutes, meta, is_main_file)):
-                    text_lists[i] += text_list
-                else:
-                    is_class[i] = False
+            text_lists, is_class = text_from_latex_stream(
+                fin, classifications=classifications, meta=meta,
+                is_class=is_class, filter_text=filter_text, gazetteer=gazetteer)
+
+    return text_lists, is_class
+
+def text_from_latex_stream(fin, classifications=None, meta=None, is_class=None, filter_text=always_true, gazetteer=None):
+    """
+    Same as `text_from_latex`, but reads the lines of LaTeX source from
+    the text stream `fin`, e.g. a member of an e-print read in memory.
+    """
+    if classifications is None:
+        classifications = [lambda x: True] # return all text as one class
+        is_class = [True]
+    elif is_class is None:
+        is_class = [True for i in range(len(classifications))]
+
+    n_classes = len(classifications)
+    text_lists = [[] for _ in range(n_classes)]
+    text_list = []
+    institutes = Counter()
+    something_begins = 0
+    is_main_file = False # has \documentclass
+    text = ''
+    for line in fin:
+        # Flag a skip segment
+        if '\begin' in line:
+            something_begins += 1
+        # End a skip segment
+        elif something_begins and '\end' in line:
+            something_begins -= 1
+        # Read text in chunks of paragraphs
+        elif something_begins == 0:
+            if line != '\n':
+                text += line
+            else:
+                is_main_file |= '\documentclass' in text
+
+                # Find institutes/universities
+                if is_main_file:
+                    institutes.update(find_institutes(text, gazetteer=gazetteer))
+
+                cleaned_text = clean_text(text)
+                sents = split_sent(cleaned_text)
+                text_list += [sent for sent in sents if filter_text(sent)]
+                text = ''
+    if text != '':
+        cleaned_text = clean_text(text)
+        sents = split_sent(cleaned_text)
+        text_list += [sent for sent in sents if filter_text(sent)]
+        text = ''
+
+    # Classify the text
+    for i, filt in enumerate(classifications):
+        if is_class[i]:
+            if filt((text_list, institutes, meta, is_main_file)):
+                text_lists[i] += text_list
+            else:
+                is_class[i] = False
 
     return text_lists, is_class
@@ -0,0 +1,98 @@
+import re
+
+
+def build_trie(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for c in word:
+            node = node.setdefault(c, {})
+        node[''] = word # end of a word
+    return trie
+
+def trie_to_regex(node):
+    """
+    Turn a trie into a regex that matches any of its words, preferring the longest.
+    Alternatives are factored by their common prefixes, so the regex engine only
+    tries the branches of the next character instead of every word.
+    """
+    branches = [re.escape(c) + trie_to_regex(child) for c, child in sorted(node.items()) if c != '']
+    if not branches:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+    regex = '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        regex += '?'
+    return regex
+
+
+class PatternSet(object):
+    """
+    A compiled set of lower-cased patterns.
+    String values are searched for any pattern as a substring in a single regex pass,
+    list values (e.g. authors) are matched element-wise against the exact patterns.
+    """
+
+    def __init__(self, words):
+        self.words = frozenset(word.lower() for word in words)
+        self.trie = build_trie(self.words)
+        self.regex = re.compile('(?=({}))'.format(trie_to_regex(self.trie))) if self.words else None
+
+    def contains(self, value):
+        if not self.words:
+            return False
+        if isinstance(value, str):
+            return self.regex.search(value) is not None
+        return any(v in self.words for v in value)
+
+    def find(self, value):
+        """Return the set of patterns found in `value`."""
+        if not self.words:
+            return set()
+        if not isinstance(value, str):
+            return set(self.words.intersection(value))
+
+        found = set()
+        for m in self.regex.finditer(value):
+            # Every pattern starting here is a prefix of the longest match
+            node = self.trie
+            for c in m.group(1):
+                node = node[c]
+                if '' in node:
+                    found.add(node[''])
+        return found
+
+
+class FilterMatcher(object):
+    """
+    Compiled `filters` of a Scraper.
+
+    Paramters
+    ---------
+    filters: dictionary
+        Maps record keys to lists of patterns.
+    mode: str
+        'or' keeps records matching any key, 'and' keeps records matching every key.
+    """
+
+    def __init__(self, filters, mode='or'):
+        if mode not in ('or', 'and'):
+            raise ValueError('mode should be \'or\' or \'and\', got \'{}\''.format(mode))
+        self.mode = mode
+        self.patterns = {key: PatternSet(words) for key, words in filters.items()}
+
+    def is_match(self, record):
+        hits = (patterns.contains(record[key]) for key, patterns in self.patterns.items())
+        return any(hits) if self.mode == 'or' else all(hits)
+
+    def match(self, record):
+        """
+        Return a dictionary from keys to the patterns found in the record,
+        or None if the record does not pass the filters.
+        """
+        found = {key: patterns.find(record[key]) for key, patterns in self.patterns.items()}
+        hits = [bool(words) for words in found.values()]
+        if not (any(hits) if self.mode == 'or' else all(hits)):
+            return None
+        return {key: words for key, words in found.items() if words}
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+
+def metric_key(name, labels):
+    """`name{label="value",...}` with the labels sorted, as in the Prometheus text format."""
+    if not labels:
+        return name
+    return '{}{{{}}}'.format(name, ','.join('{}="{}"'.format(k, labels[k]) for k in sorted(labels)))
+
+
+class Histogram(object):
+    """Count, sum, min, max and cumulative bucket counts of observed values."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def output(self):
+        return {'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max,
+            'buckets': dict(zip(map(str, self.buckets), self.counts))}
+
+
+class Metrics(object):
+    """
+    Counters and histograms of the stages of a scrape, e.g. bytes fetched, request
+    latency, retries and back-off sleeps, decompression and extraction time, and
+    sentences saved per class. Metrics are keyed by name and optional labels.
+
+    Progress events are passed to the listeners as `listener(event, metrics)`,
+    where `event` is a dict with its `type`, `time` and fields. See
+    `JsonLinesExporter` and `PrometheusTextfileExporter`.
+
+    Paramters
+    ---------
+    listeners: list
+        Callables receiving each event. Default: none.
+    """
+
+    def __init__(self, listeners=()):
+        self.listeners = list(listeners)
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock() # e-prints are fetched by a thread pool
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def inc(self, name, value=1, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observe the seconds spent in the `with` block in histogram `name`."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def get(self, name, **labels):
+        """The value of a counter, or the sum of a histogram."""
+        key = metric_key(name, labels)
+        if key in self.histograms:
+            return self.histograms[key].sum
+        return self.counters.get(key, 0)
+
+    def event(self, type, **fields):
+        if not self.listeners:
+            return
+        event = dict(fields, type=type, time=time.time())
+        for listener in self.listeners:
+            listener(event, self)
+
+    def output(self):
+        """All counters and histograms as a dict, keyed by `metric_key`."""
+        with self.lock:
+            return {'counters': dict(self.counters),
+                'histograms': {key: h.output() for key, h in self.histograms.items()}}
+
+    def report(self):
+        """Log the counters, and the count and total time of the histograms."""
+        output = self.output()
+        for key, value in sorted(output['counters'].items()):
+            logger.info('{}: {}'.format(key, value))
+        for key, h in sorted(output['histograms'].items()):
+            logger.info('{}: {:d} in {:.1f} seconds (max {:.2f})'.format(key, h['count'], h['sum'], h['max']))
+
+    def close(self):
+        for listener in self.listeners:
+            if hasattr(listener, 'close'):
+                listener.close()
+
+
+class CountingReader(object):
+    """Wraps a file-like object and counts the bytes read from it."""
+
+    def __init__(self, fin):
+        self.fin = fin
+        self.n_bytes = 0
+
+    def read(self, size=-1):
+        data = self.fin.read(size)
+        self.n_bytes += len(data)
+        return data
+
+    def close(self):
+        self.fin.close()
+
+
+class JsonLinesExporter(object):
+    """Writes each event as a JSON line to `path`."""
+
+    def __init__(self, path, append=False):
+        self.fout = open(path, 'a' if append else 'w')
+
+    def __call__(self, event, metrics):
+        self.fout.write(json.dumps(event) + '\n')
+        self.fout.flush()
+
+    def close(self):
+        self.fout.close()
+
+
+class PrometheusTextfileExporter(object):
+    """
+    Writes all metrics in the Prometheus text format to `path`, for the textfile
+    collector of the node exporter, at most every `interval` seconds and when a
+    scrape is done. The file is replaced atomically.
+    """
+    INVALID_CHARS = re.compile(r'[^a-zA-Z0-9_:]')
+
+    def __init__(self, path, interval=15, prefix='paperscraper_'):
+        self.path = path
+        self.interval = interval
+        self.prefix = prefix
+        self.written = 0
+
+    def __call__(self, event, metrics):
+        if event['type'] == 'done' or event['time'] - self.written >= self.interval:
+            self.write(metrics)
+            self.written = event['time']
+
+    def name(self, key):
+        name, brace, labels = key.partition('{')
+        return self.prefix + self.INVALID_CHARS.sub('_', name), brace + labels
+
+    def write(self, metrics):
+        lines = []
+        output = metrics.output()
+        types = set()
+        for key, value in sorted(output['counters'].items()):
+            name, labels = self.name(key)
+            if name not in types:
+                lines.append('# TYPE {}_total counter'.format(name))
+                types.add(name)
+            lines.append('{}_total{} {}'.format(name, labels, value))
+        for key, h in sorted(output['histograms'].items()):
+            name, labels = self.name(key)
+            if name not in types:
+                lines.append('# TYPE {} histogram'.format(name))
+                types.add(name)
+            inner = labels[1:-1] + ',' if labels else ''
+            for bound, count in h['buckets'].items():
+                lines.append('{}_bucket{{{}le="{}"}} {}'.format(name, inner, bound, count))
+            lines.append('{}_bucket{{{}le="+Inf"}} {}'.format(name, inner, h['count']))
+            lines.append('{}_sum{} {}'.format(name, labels, h['sum']))
+            lines.append('{}_count{} {}'.format(name, labels, h['count']))
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix='.tmp-')
+        with os.fdopen(fd, 'w') as fout:
+            fout.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
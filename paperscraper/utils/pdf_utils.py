@@ -1,19 +1,94 @@
-import pdftotext
+import hashlib
+import logging
+import re
+from contextlib import closing
+from io import BytesIO
 
-from .utils import split_sent, always_true
+from .utils import split_sent, always_true, iter_ahead
 
 
-def text_from_pdf(fpath, filter_text=always_true):
+logger = logging.getLogger(__name__)
+
+CJK = '\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef'
+# pdftotext lays out CJK text with spaces and line breaks between characters
+CJK_SPACE = re.compile(r'(?<=[{0}])\s+(?=[{0}])'.format(CJK))
+SPACE = re.compile(r'\s+')
+
+PARALLEL_MIN_PAGES = 48 # below this, parsing the PDF in the workers costs more than it saves
+
+_worker_pdf = (None, None) # key and parsed PDF of a worker process, parsed once per document
+
+
+def clean_pdf_text(text):
+    """Drop the whitespace between CJK characters and collapse the other whitespace to single spaces."""
+    return SPACE.sub(' ', CJK_SPACE.sub('', text)).strip()
+
+def read_pdf(pdf):
+    """A `pdftotext.PDF` of `pdf`, its bytes or the path of the file."""
+    import pdftotext # optional dependency, only needed for PDFs
+    if isinstance(pdf, bytes):
+        return pdftotext.PDF(BytesIO(pdf))
+    with open(pdf, 'rb') as fin:
+        return pdftotext.PDF(fin)
+
+def _page_texts(key, pdf, start, end):
+    global _worker_pdf
+    if _worker_pdf[0] != key:
+        _worker_pdf = (key, read_pdf(pdf))
+    doc = _worker_pdf[1]
+    return [clean_pdf_text(doc[i]) for i in range(start, end)]
+
+def iter_pdf_pages(pdf, n_procs=1, pages_per_task=16, min_pages=PARALLEL_MIN_PAGES, pool=None):
+    """
+    Yield the cleaned text of each page of `pdf`, its bytes or path, in order.
+    With `n_procs` > 1, a document of at least `min_pages` pages is split into ranges
+    of `pages_per_task` pages extracted by a process pool, up to `2 * n_procs` ranges
+    ahead of the caller. Each worker parses the document once, on its first range.
+    `pool` is a `ProcessPoolExecutor` kept across documents, e.g. for a whole scrape;
+    without it, a pool is started for the document. Closing the generator early
+    cancels the pending ranges. Raises the errors of `pdftotext` for a document
+    that cannot be read.
+    """
+    doc = read_pdf(pdf)
+    n_pages = len(doc)
+    if n_procs <= 1 or n_pages < max(min_pages, 2):
+        for i in range(n_pages):
+            yield clean_pdf_text(doc[i])
+        return
+
+    if not isinstance(pdf, bytes):
+        with open(pdf, 'rb') as fin:
+            pdf = fin.read()
+    key = hashlib.blake2b(pdf, digest_size=16).digest()
+    shutdown = pool is None
+    if shutdown:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=n_procs)
+    ranges = [(start, min(start + pages_per_task, n_pages)) for start in range(0, n_pages, pages_per_task)]
+    submit = lambda page_range: pool.submit(_page_texts, key, pdf, *page_range)
+    with closing(iter_ahead(pool, ranges, submit, 2 * n_procs, shutdown=shutdown)) as extractions:
+        for _, future in extractions:
+            for text in future.result():
+                yield text
+
+def text_from_pdf(pdf, filter_text=always_true, max_sent=None, n_procs=1, pool=None):
+    """
+    Sentences of `pdf`, its bytes or path, that pass `filter_text`, as a single class.
+    Stops extracting pages once `max_sent` sentences are found.
+    The pages of long PDFs are extracted by `n_procs` processes, see `iter_pdf_pages`.
+    """
+    import pdftotext # optional dependency, imported here so that a missing module is not a PDF error
+
     text_list = []
-    with open(fpath, 'rb') as fin:
-        try:
-            pdf = pdftotext.PDF(fin)
-        except Exception as e:
-            print(e)
-            return [text_list]
-
-    for page in pdf:
-        text = ''.join(page.split())
-        text_list += [sent for sent in split_sent(text) if filter_text(sent)]
-
-    return [text_list]
\ No newline at end of file
+    pages = iter_pdf_pages(pdf, n_procs=n_procs, pool=pool)
+    try:
+        for text in pages:
+            text_list += [sent for sent in split_sent(text) if filter_text(sent)]
+            if max_sent is not None and len(text_list) >= max_sent:
+                break
+    except Exception as e:
+        logger.warning(e)
+    finally:
+        pages.close()
+
+    return [text_list]
@@ -0,0 +1,169 @@
+import gzip
+import json
+import os
+
+
+COMPRESSIONS = (None, 'gzip', 'zstd')
+
+
+class TextSink(object):
+    """
+    Writes lines of text to an output kept open for the life of a scrape,
+    buffering them and writing in large batches.
+
+    Output can be compressed with gzip or zstd, and rolled into shards of about
+    `shard_size` bytes named `<root>.00000<ext>`, `<root>.00001<ext>`, ... for
+    `path` = `<root><ext>`. The shards are listed with their sizes and line counts
+    in `path` + '.index'.
+
+    `checkpoint` flushes the lines written so far and ends the current compressed
+    frame, and returns the position of the output. A sink created with that position
+    as `resume_from` truncates the output back to it, e.g. when resuming a scrape.
+
+    Paramters
+    ---------
+    path: str
+        Path of the output file.
+    append: bool
+        Append to the output instead of overwriting it.
+    compression: str
+        None, 'gzip' or 'zstd' (requires the `zstandard` package). Default: None.
+    shard_size: int
+        Approximate maximum size in bytes of each shard. Default: None (no sharding).
+    buffer_size: int
+        Number of bytes buffered before writing. Default: 1 MB.
+    resume_from: list
+        Position returned by `checkpoint` to truncate the output to.
+    """
+
+    def __init__(self, path, append=False, compression=None, shard_size=None,
+        buffer_size=1024 ** 2, resume_from=None
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError('compression should be one of {}, got \'{}\''.format(COMPRESSIONS, compression))
+        if compression == 'zstd':
+            import zstandard # optional dependency
+            self._zstd = zstandard.ZstdCompressor()
+
+        self.path = path
+        self.compression = compression
+        self.shard_size = shard_size
+        self.buffer_size = buffer_size
+
+        self.buffer = []
+        self.buffered = 0
+        self.shards = []    # [name, size, lines] of the completed shards
+        self.shard = 0
+        self.lines = 0      # lines in the current shard
+        self.writer = None  # compressor of the current frame
+
+        mode = 'ab' if append or resume_from is not None else 'wb'
+        previous = self._read_index()
+        if resume_from is not None:
+            self.shard, size, self.lines = resume_from
+            self.shards = previous[:self.shard]
+            for name, _, _ in previous[self.shard + 1:]:
+                self._remove(name)
+            self.raw = open(self.shard_path(self.shard), mode)
+            self.raw.truncate(size)
+            self.raw.seek(0, os.SEEK_END)
+        elif append and previous:
+            self.shards = previous[:-1]
+            self.shard = len(self.shards)
+            self.lines = previous[-1][2]
+            self.raw = open(self.shard_path(self.shard), mode)
+        else:
+            if not append:
+                for name, _, _ in previous[1:]:
+                    self._remove(name)
+            self.raw = open(self.shard_path(self.shard), mode)
+
+    def shard_path(self, shard):
+        if self.shard_size is None:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return '{}.{:05d}{}'.format(root, shard, ext)
+
+    def write_lines(self, lines):
+        for line in lines:
+            line = '{}\n'.format(line)
+            self.buffer.append(line)
+            self.buffered += len(line)
+        self.lines += len(lines)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            data = ''.join(self.buffer).encode('utf-8')
+            self.buffer = []
+            self.buffered = 0
+            self._writer().write(data)
+        if self.shard_size is not None and self.raw.tell() >= self.shard_size:
+            self._roll()
+
+    def checkpoint(self):
+        """Write out all lines, end the compressed frame, and return the position of the output."""
+        self.flush()
+        self._end_frame()
+        self.raw.flush()
+        return [self.shard, self.raw.tell(), self.lines]
+
+    def close(self):
+        if self.raw is None:
+            return
+        self.checkpoint()
+        if self.shard_size is not None:
+            self._write_index()
+        self.raw.close()
+        self.raw = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _writer(self):
+        if self.writer is None:
+            if self.compression == 'gzip':
+                self.writer = gzip.GzipFile(fileobj=self.raw, mode='wb')
+            elif self.compression == 'zstd':
+                self.writer = self._zstd.stream_writer(self.raw, closefd=False)
+            else:
+                self.writer = self.raw
+        return self.writer
+
+    def _end_frame(self):
+        if self.writer is not None and self.writer is not self.raw:
+            self.writer.close() # writes the trailer, keeps the raw file open
+        self.writer = None
+
+    def _roll(self):
+        self._end_frame()
+        self.shards.append([os.path.basename(self.shard_path(self.shard)), self.raw.tell(), self.lines])
+        self.raw.close()
+        self.shard += 1
+        self.lines = 0
+        self.raw = open(self.shard_path(self.shard), 'wb')
+        self._write_index()
+
+    def _index_path(self):
+        return self.path + '.index'
+
+    def _read_index(self):
+        if self.shard_size is None or not os.path.isfile(self._index_path()):
+            return []
+        with open(self._index_path()) as fin:
+            return [json.loads(line) for line in fin if line.strip()]
+
+    def _write_index(self):
+        current = [os.path.basename(self.shard_path(self.shard)), self.raw.tell(), self.lines]
+        with open(self._index_path(), 'w') as fout:
+            for shard in self.shards + [current]:
+                print(json.dumps(shard), file=fout)
+
+    def _remove(self, name):
+        path = os.path.join(os.path.dirname(self.path), name)
+        if os.path.isfile(path):
+            os.remove(path)
@@ -1,10 +1,19 @@
 from datetime import datetime, timedelta
+import logging
 import re
+import sys
 import time
-from urllib.request import urlopen
+from collections import deque
+from http.client import HTTPException
 from urllib.error import HTTPError
+from urllib.parse import urlsplit
 from socket import error as SocketError
 
+from .governor import CircuitOpenError, parse_retry_after
+from .http import default_client
+
+
+logger = logging.getLogger(__name__)
 
 ERROR_BACKOFF_RATE = 1.5
 
@@ -25,16 +34,45 @@ def get_date_chunks(date_from, date_until, intv=30, reverse=True):
             s += intv + timedelta(1)
         yield (s.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
 
-def split_sent(text):
-    text = text.strip()
-    text = re.sub('\.[\.]+', '<dots>', text) # avoid dots being mixed up with periods
-    splits = re.split('(。|？+|！+|\?+|!+|\.)', text)
+class SentenceSegmenter(object):
+    """
+    Splits text into sentences ending with 。, ？, ！, ?, ! or a period,
+    keeping runs of dots (ellipses) within sentences. Text after the last
+    punctuation mark is kept as the last sentence.
+    Each sentence keeps its leading whitespace, as split from the text.
+    """
+    SEP = '\x00' # paragraph separator in batch mode
+    PATTERN = re.compile(r'((?:[^。？！?!.\x00]+|\.\.+)*(?:。|？+|！+|\?+|!+|\.)?)(\x00)?')
+
+    def split(self, text):
+        return self.split_batch([text])[0]
+
+    def split_batch(self, texts):
+        """Split many paragraphs in a single regex pass. Returns a list of sentences per paragraph."""
+        texts = list(texts)
+        if not texts:
+            return []
+
+        splits = [[]]
+        joined = self.SEP.join(text.replace(self.SEP, '').strip() for text in texts)
+        for sent, sep in self.PATTERN.findall(joined):
+            if sent.strip():
+                splits[-1].append(sent)
+            if sep:
+                splits.append([])
+        return splits
+
+    def iter_sentences(self, texts):
+        """Yield the sentences of a stream of paragraphs."""
+        for text in texts:
+            for sent in self.split(text):
+                yield sent
 
-    # Join every two elements in list, one the main sentence, one the delimeter punctuation
-    splits = [''.join(x) for x in zip(splits[0::2], splits[1::2])]
 
-    splits = [re.sub('<dots>', '...', split) for split in splits]
-    return splits
+SEGMENTER = SentenceSegmenter()
+
+def split_sent(text):
+    return SEGMENTER.split(text)
 
 def is_chinese(text):
     return len(re.findall('[\u4e00-\u9fff]+', text)) > 0
@@ -45,34 +83,131 @@ def always_true(x):
 def always_false(x):
     return False
 
-def try_urlopen(req, sleep_t, failed_attempts=0):
+def iter_ahead(pool, items, submit, n_ahead, shutdown=True):
+    """
+    Yield `(item, future)` for each of `items` in order, where `future` is `submit(item)`,
+    a future of the executor `pool` or None, keeping up to `n_ahead` items submitted
+    ahead of the caller. When the caller stops early, the pending futures are cancelled.
+    The pool is shut down at the end unless `shutdown` is False.
+    """
+    items = iter(items)
+    pending = deque()
+    try:
+        def submit_next():
+            for item in items:
+                pending.append((item, submit(item)))
+                break
+
+        for _ in range(n_ahead):
+            submit_next()
+        while pending:
+            item, future = pending.popleft()
+            submit_next()
+            yield item, future
+    finally:
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
+        if shutdown:
+            pool.shutdown(wait=True)
+
+class StdoutHandler(logging.StreamHandler):
+    """Writes to the current `sys.stdout`, even if it is replaced after the handler is created."""
+
+    def __init__(self):
+        super(StdoutHandler, self).__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, stream):
+        pass
+
+def log_to_stdout():
+    """Print the progress messages of the package to stdout, as plain messages."""
+    package_logger = logging.getLogger('paperscraper')
+    if not any(isinstance(handler, StdoutHandler) for handler in package_logger.handlers):
+        handler = StdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        package_logger.addHandler(handler)
+    package_logger.setLevel(logging.INFO)
+
+def try_urlopen(req, sleep_t, failed_attempts=0, metrics=None, client=None, compressed=False, governor=None):
+    """
+    Open `req`, returning `(success, response, failed_attempts)`.
+    A failed attempt sleeps `sleep_t` times an exponential back-off.
+    With a `RateGovernor`, the request waits for its turn to the host, a 503 or a
+    connection reset slows down the host for all requests sharing the governor instead
+    of sleeping here, and 5xx and connection errors count toward its circuit breaker.
+    While the circuit of the host is open, the cooldown is waited out and the request
+    is given up.
+    """
     fail_t = int(sleep_t * (ERROR_BACKOFF_RATE ** failed_attempts))
+    host = None
+    if governor is not None:
+        host = urlsplit(req.get_full_url() if hasattr(req, 'get_full_url') else req).hostname
+        try:
+            waited = governor.acquire(host)
+        except CircuitOpenError as e:
+            wait_t = max(0, e.until - time.time())
+            logger.warning('{} Waiting {:.0f} seconds and skipping.'.format(e, wait_t))
+            if metrics is not None:
+                metrics.inc('request_errors', error='circuit_open')
+                metrics.inc('sleep_seconds', wait_t)
+            time.sleep(wait_t)
+            return False, None, failed_attempts
+        if waited and metrics is not None:
+            metrics.inc('throttle_seconds', waited)
+
+    def retry_message(error):
+        if governor is None:
+            return 'Got {}. Retrying after {} seconds.'.format(error, fail_t)
+        return 'Got {}. Slowing down requests to {}.'.format(error, host)
+
+    def back_off(error, message, throttled=False, retry_after=None, host_failed=False):
+        logger.warning(message)
+        if governor is not None:
+            if throttled:
+                governor.throttle(host, retry_after)
+                if metrics is not None:
+                    metrics.inc('retries', error=error)
+                    metrics.event('retry', error=error, retry_after=retry_after)
+                return False, None, failed_attempts + 1
+            if host_failed:
+                governor.failure(host)
+
+        if metrics is not None:
+            metrics.inc('retries', error=error)
+            metrics.inc('sleep_seconds', fail_t)
+            metrics.event('retry', error=error, sleep=fail_t)
+        time.sleep(fail_t)
+        return False, None, failed_attempts + 1
+
     try:
-        response = urlopen(req)
+        response = (client if client is not None else default_client()).urlopen(req, compressed=compressed)
     except HTTPError as e:
         if e.code == 503:
-            print('Got {}. Retrying after {} seconds.'.format(e.code, fail_t))
-            time.sleep(fail_t)
-            return False, None, failed_attempts + 1
+            retry_after = parse_retry_after(e.headers.get('Retry-After')) if e.headers else None
+            return back_off(e.code, retry_message(e.code), throttled=True, retry_after=retry_after)
         elif e.code == 403:
             # No penalty here
-            print('Got {}. Skip.'.format(e.code))
+            logger.warning('Got {}. Skip.'.format(e.code))
+            if metrics is not None:
+                metrics.inc('request_errors', error=e.code)
             return False, None, failed_attempts
         else:
-            print('HTTPError:', e)
-            time.sleep(fail_t)
-            return False, None, failed_attempts + 1
+            return back_off(e.code, 'HTTPError: {}'.format(e), host_failed=e.code >= 500)
     except SocketError as e:
         if e.errno == 104:
-            print('Got {}. Retrying after {} seconds.'.format(e.errno, fail_t))
-            time.sleep(fail_t)
-            return False, None, failed_attempts + 1
+            return back_off(e.errno, retry_message(e.errno), throttled=True)
         else:
-            print('SocketError:', e)
-            time.sleep(fail_t)
-            return False, None, failed_attempts + 1
+            return back_off('socket', 'SocketError: {}'.format(e), host_failed=True)
+    except HTTPException as e:
+        return back_off('http', 'HTTPException: {}'.format(e), host_failed=True)
     except Exception as e:
-        print('Exception:', e)
-        time.sleep(fail_t)
-        return False, None, failed_attempts + 1
+        return back_off('exception', 'Exception: {}'.format(e))
+    if governor is not None:
+        governor.success(host)
     return True, response, 0
@@ -30,12 +30,23 @@ setup(
     url = "https://github.com/pyliaorachel/paperscraper",
     keywords = ["arxiv", "scraper", "api", "citation"],
     license = "MIT",
-    install_requires=[
-        'marisa-trie',
-        'BeautifulSoup4',
-        'pdftotext',
-        'selenium'
-    ],
+    packages=['paperscraper', 'paperscraper.utils', 'paperscraper.backends'],
+    install_requires=[],
+    extras_require={
+        'google-scholar': ['BeautifulSoup4>=4.7.1', 'pdftotext>=2.1.1'],
+        'ms-academic': ['selenium>=3.141.0,<4', 'pdftotext>=2.1.1'],
+        'pdf': ['pdftotext>=2.1.1'],
+        'zstd': ['zstandard'],
+        'snapshot': ['orjson'],
+        'parquet': ['pyarrow'],
+    },
+    entry_points={
+        'paperscraper.backends': [
+            'arxiv = paperscraper.backends.arxiv:ArxivBackend',
+            'google-scholar = paperscraper.backends.google_scholar:GoogleScholarBackend',
+            'ms-academic = paperscraper.backends.ms_academic:MsAcademicBackend',
+        ],
+    },
     classifiers = [
         "Programming Language :: Python :: 2",
         "Programming Language :: Python :: 2.7",